@@ -82,6 +82,7 @@ class FactorSettings(BaseSettings):
     min_history_periods: int = Field(default=100, description="最小历史周期数")
     outlier_threshold: float = Field(default=3.0, description="异常值阈值(标准差倍数)")
     missing_threshold: float = Field(default=0.1, description="缺失值阈值")
+    autoregister: bool = Field(default=True, description="导入技术因子模块时自动注册内置因子")
     
     class Config:
         env_prefix = "FACTOR_"
@@ -3,12 +3,15 @@
 """
 
 from .base import BaseDataCollector
-from .exchange import ExchangeCollector, BinanceCollector, OKXCollector, MultiExchangeCollector
+from .exchange import (
+    ExchangeCollector, BinanceCollector, OKXCollector, MultiExchangeCollector, close_shared_session
+)
 
 __all__ = [
     "BaseDataCollector",
     "ExchangeCollector",
     "BinanceCollector",
     "OKXCollector", 
-    "MultiExchangeCollector"
+    "MultiExchangeCollector",
+    "close_shared_session"
 ] 
\ No newline at end of file
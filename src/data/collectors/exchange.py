@@ -3,7 +3,8 @@
 支持主流交易所的数据采集
 """
 
-import ccxt
+import ccxt.async_support as ccxt
+import aiohttp
 import asyncio
 import pandas as pd
 from typing import Dict, List, Optional
@@ -12,6 +13,47 @@ from .base import BaseDataCollector, Logger
 from src.config.settings import get_settings
 
 
+# 所有交易所实例共享的HTTP会话, 复用TLS握手和DNS缓存
+_SHARED_SESSION: Optional[aiohttp.ClientSession] = None
+# 创建共享会话时所在的事件循环, 会话只能在该循环中使用
+_SHARED_SESSION_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_session() -> aiohttp.ClientSession:
+    """
+    获取(必要时创建)当前事件循环上的共享aiohttp会话
+    
+    只能在协程中调用; 会话已关闭或属于其他事件循环时重新创建
+    """
+    global _SHARED_SESSION, _SHARED_SESSION_LOOP
+    
+    loop = asyncio.get_running_loop()
+    if (
+        _SHARED_SESSION is None
+        or _SHARED_SESSION.closed
+        or _SHARED_SESSION_LOOP is not loop
+    ):
+        _SHARED_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+        )
+        _SHARED_SESSION_LOOP = loop
+    return _SHARED_SESSION
+
+
+async def close_shared_session():
+    """关闭共享的aiohttp会话 (进程退出前调用一次)"""
+    global _SHARED_SESSION, _SHARED_SESSION_LOOP
+    
+    if _SHARED_SESSION is not None and not _SHARED_SESSION.closed:
+        await _SHARED_SESSION.close()
+    _SHARED_SESSION = None
+    _SHARED_SESSION_LOOP = None
+
+
 class ExchangeCollector(BaseDataCollector):
     """交易所数据采集器"""
     
@@ -49,11 +91,28 @@ class ExchangeCollector(BaseDataCollector):
             self.logger.error(f"交易所设置失败: {e}")
             raise
     
+    def _bind_session(self):
+        """
+        为交易所实例挂载当前事件循环上的共享会话 (只能在协程中调用)
+        
+        采集器通常在事件循环启动前同步构造, 因此会话在首次请求前才挂载;
+        own_session为False时ccxt不会在close()中关闭共享会话.
+        实例已自行创建会话时保持不变
+        """
+        if self.exchange.session is not None and self.exchange.own_session:
+            return
+        
+        session = _get_session()
+        if self.exchange.session is not session:
+            self.exchange.session = session
+            self.exchange.own_session = False
+    
     async def connect(self) -> bool:
         """连接到交易所"""
         try:
             if not self.exchange:
                 self._setup_exchange()
+            self._bind_session()
             
             # 测试连接
             await self.exchange.load_markets()
@@ -65,11 +124,12 @@ class ExchangeCollector(BaseDataCollector):
             return False
     
     async def disconnect(self):
-        """断开连接"""
+        """断开连接 (可重复调用, 已断开时直接返回)"""
         if self.exchange:
+            exchange, self.exchange = self.exchange, None
             try:
-                if hasattr(self.exchange, 'close'):
-                    await self.exchange.close()
+                if hasattr(exchange, 'close'):
+                    await exchange.close()
                 self.logger.info(f"已断开与 {self.exchange_name} 的连接")
             except Exception as e:
                 self.logger.warning(f"断开连接时出现警告: {e}")
@@ -90,6 +150,39 @@ class ExchangeCollector(BaseDataCollector):
             self.logger.error(f"获取交易对列表失败: {e}")
             return []
     
+    async def _fetch_ohlcv_raw(
+        self,
+        symbol: str,
+        timeframe: str,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = 1000
+    ) -> List:
+        """获取原始OHLCV数据(不做格式化和指标计算)"""
+        if not self.validate_symbol(symbol) or not self.validate_timeframe(timeframe):
+            raise ValueError(f"无效的参数: symbol={symbol}, timeframe={timeframe}")
+        
+        if not self.exchange:
+            await self.connect()
+        self._bind_session()
+        
+        # 转换时间戳
+        since_ts = None
+        if since:
+            since_ts = int(since.timestamp() * 1000)
+        
+        # 获取数据
+        return await self.exchange.fetch_ohlcv(
+            symbol, timeframe, since_ts, limit
+        )
+    
+    def _build_ohlcv_frame(self, ohlcv: List, symbol: str, timeframe: str) -> pd.DataFrame:
+        """将原始OHLCV数据格式化并计算技术指标"""
+        # 格式化数据
+        df = self.format_ohlcv_data(ohlcv, symbol, timeframe)
+        
+        # 计算技术指标
+        return self.calculate_technical_indicators(df)
+    
     async def get_ohlcv(
         self,
         symbol: str,
@@ -99,27 +192,8 @@ class ExchangeCollector(BaseDataCollector):
     ) -> pd.DataFrame:
         """获取OHLCV数据"""
         try:
-            if not self.validate_symbol(symbol) or not self.validate_timeframe(timeframe):
-                raise ValueError(f"无效的参数: symbol={symbol}, timeframe={timeframe}")
-            
-            if not self.exchange:
-                await self.connect()
-            
-            # 转换时间戳
-            since_ts = None
-            if since:
-                since_ts = int(since.timestamp() * 1000)
-            
-            # 获取数据
-            ohlcv = await self.exchange.fetch_ohlcv(
-                symbol, timeframe, since_ts, limit
-            )
-            
-            # 格式化数据
-            df = self.format_ohlcv_data(ohlcv, symbol, timeframe)
-            
-            # 计算技术指标
-            df = self.calculate_technical_indicators(df)
+            ohlcv = await self._fetch_ohlcv_raw(symbol, timeframe, since, limit)
+            df = self._build_ohlcv_frame(ohlcv, symbol, timeframe)
             
             self.logger.info(f"获取 {symbol} {timeframe} 数据 {len(df)} 条")
             return df
@@ -133,6 +207,7 @@ class ExchangeCollector(BaseDataCollector):
         try:
             if not self.exchange:
                 await self.connect()
+            self._bind_session()
             
             orderbook = await self.exchange.fetch_order_book(symbol, limit)
             
@@ -161,6 +236,7 @@ class ExchangeCollector(BaseDataCollector):
         try:
             if not self.exchange:
                 await self.connect()
+            self._bind_session()
             
             since_ts = None
             if since:
@@ -186,6 +262,7 @@ class ExchangeCollector(BaseDataCollector):
         try:
             if not self.exchange:
                 await self.connect()
+            self._bind_session()
             
             ticker = await self.exchange.fetch_ticker(symbol)
             return ticker
@@ -262,10 +339,26 @@ class MultiExchangeCollector:
             results[name] = await collector.connect()
         return results
     
-    async def disconnect_all(self):
-        """断开所有连接"""
-        for collector in self.collectors.values():
-            await collector.disconnect()
+    async def disconnect_all(self, timeout: Optional[float] = 5.0):
+        """
+        断开所有连接
+        
+        各交易所并发断开, 总耗时取最慢的一个; 超过timeout秒仍未完成时放弃等待,
+        避免连接卡死时阻塞事件循环退出
+        """
+        if not self.collectors:
+            return
+        
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(
+                    *(collector.disconnect() for collector in self.collectors.values()),
+                    return_exceptions=True
+                ),
+                timeout=timeout
+            )
+        except asyncio.TimeoutError:
+            self.logger.warning(f"断开交易所连接超时 ({timeout}秒)")
     
     async def get_ohlcv_from_best_source(
         self,
@@ -279,18 +372,28 @@ class MultiExchangeCollector:
         # 优先级顺序
         priority = ["binance", "okx"]
         
+        # 先只拉取原始数据, 选定数据源后再做格式化和指标计算,
+        # 避免在被丢弃的数据源上做无用功
         for exchange in priority:
             if exchange in self.collectors:
+                collector = self.collectors[exchange]
                 try:
-                    df = await self.collectors[exchange].get_ohlcv(
+                    ohlcv = await collector._fetch_ohlcv_raw(
                         symbol, timeframe, since, limit
                     )
-                    if not df.empty:
-                        df['exchange'] = exchange
-                        return df
+                    if not ohlcv:
+                        continue
+                    
+                    # 格式化失败 (如数据行格式异常) 同样回退到下一个数据源
+                    df = collector._build_ohlcv_frame(ohlcv, symbol, timeframe)
                 except Exception as e:
                     self.logger.warning(f"{exchange} 获取数据失败: {e}")
                     continue
+                
+                if not df.empty:
+                    df['exchange'] = exchange
+                    self.logger.info(f"从 {exchange} 获取 {symbol} {timeframe} 数据 {len(df)} 条")
+                    return df
         
         self.logger.error(f"所有交易所都无法获取 {symbol} 数据")
         return pd.DataFrame()
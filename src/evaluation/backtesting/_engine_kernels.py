@@ -0,0 +1,98 @@
+"""
+回测引擎计算内核
+单标的因子回测的逐bar状态机, 由numba编译为机器码
+"""
+
+import math
+import numpy as np
+from src.utils.jit import njit
+
+
+# 交易记录数组的列定义
+TRADE_BAR = 0          # 成交所在bar的下标
+TRADE_SIDE = 1         # 1: 买入, -1: 卖出
+TRADE_SIZE = 2         # 成交数量
+TRADE_COST = 3         # 手续费+滑点
+
+
+@njit(cache=True)
+def _run_factor_backtest_kernel(factor, close, init_cap, comm, slip, buy_thr, sell_thr):
+    """
+    简单因子策略的回测内核
+
+    Args:
+        factor: 因子值数组 (float64)
+        close: 收盘价数组 (float64)
+        init_cap: 初始资金
+        comm: 手续费率
+        slip: 滑点率
+        buy_thr: 买入阈值 (因子值大于该值时买入)
+        sell_thr: 卖出阈值 (因子值小于该值时卖出)
+
+    Returns:
+        (组合价值, 收益率, 交易记录, 交易笔数, 期末现金, 期末持仓数量, 持仓均价, 建仓bar下标)
+    """
+    n = close.shape[0]
+    pv = np.empty(n)
+    rets = np.empty(max(n - 1, 0))
+    trades = np.empty((n, 4))
+
+    cash = init_cap
+    pos_size = 0.0
+    pos_entry = 0.0
+    pos_entry_idx = -1
+    n_trades = 0
+    cost_rate = comm + slip
+
+    if n > 0:
+        pv[0] = init_cap
+
+    for i in range(1, n):
+        f = factor[i]
+        price = close[i]
+
+        signal = 0.0
+        if math.isfinite(f):
+            signal = (f > buy_thr) * 1.0 - (f < sell_thr) * 1.0
+
+        if signal != 0.0:
+            total_cost = abs(signal) * price * cost_rate
+
+            if signal > 0.0:
+                required_cash = signal * price + total_cost
+                if required_cash <= cash:
+                    cash -= required_cash
+                    if pos_size > 0.0:
+                        total_size = pos_size + signal
+                        pos_entry = (pos_size * pos_entry + signal * price) / total_size
+                        pos_size = total_size
+                    else:
+                        pos_size = signal
+                        pos_entry = price
+                        pos_entry_idx = i
+
+                    trades[n_trades, TRADE_BAR] = i
+                    trades[n_trades, TRADE_SIDE] = 1.0
+                    trades[n_trades, TRADE_SIZE] = signal
+                    trades[n_trades, TRADE_COST] = total_cost
+                    n_trades += 1
+
+            elif pos_size > 0.0:
+                sell_size = min(abs(signal), pos_size)
+                cash += sell_size * price - total_cost
+                pos_size -= sell_size
+                if pos_size <= 0.0:
+                    pos_size = 0.0
+                    pos_entry = 0.0
+                    pos_entry_idx = -1
+
+                trades[n_trades, TRADE_BAR] = i
+                trades[n_trades, TRADE_SIDE] = -1.0
+                trades[n_trades, TRADE_SIZE] = sell_size
+                trades[n_trades, TRADE_COST] = total_cost
+                n_trades += 1
+
+        pv[i] = cash + pos_size * price
+        rets[i - 1] = (pv[i] - pv[i - 1]) / pv[i - 1]
+
+    return pv, rets, trades, n_trades, cash, pos_size, pos_entry, pos_entry_idx
@@ -3,6 +3,7 @@
 用于验证因子和策略的历史表现
 """
 
+import math
 import pandas as pd
 import numpy as np
 from typing import Dict, List, Optional, Callable
@@ -10,6 +11,41 @@ from dataclasses import dataclass
 from enum import Enum
 from src.utils.logger import get_logger
 from src.evaluation.metrics.performance import PerformanceAnalyzer
+from src.evaluation.metrics.ic_analysis import qcut_labels
+from ._engine_kernels import (
+    _run_factor_backtest_kernel, TRADE_BAR, TRADE_SIDE, TRADE_SIZE, TRADE_COST
+)
+
+
+# 简单因子策略的信号阈值
+SIGNAL_THRESHOLD = 0.02
+
+# 对齐数据中因子值的列名: 因子序列可能与价格列同名 (如 'close'), 合并前统一改名
+FACTOR_COLUMN = '__factor__'
+
+# 交易缓冲区的字段数组
+TRADE_BUFFER_FIELDS = (
+    '_trade_type', '_trade_size', '_trade_price',
+    '_trade_commission', '_trade_symbol', '_trade_timestamp'
+)
+
+
+def compound_returns(returns: np.ndarray, cumulative: bool = False):
+    """
+    复利累计收益率, 在对数空间求和: expm1(sum(log1p(r)))
+    
+    多空收益等序列可能出现低于-100%的单期收益, 此时对数无定义, 退回逐项连乘
+    
+    Args:
+        returns: 收益率数组
+        cumulative: True时返回逐期累计收益率序列, 否则返回总收益率
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    if np.all(returns >= -1):
+        log_growth = np.log1p(returns)
+        return np.expm1(np.cumsum(log_growth) if cumulative else log_growth.sum())
+    growth = np.cumprod(1 + returns) if cumulative else np.prod(1 + returns)
+    return growth - 1
 
 
 class OrderType(Enum):
@@ -57,6 +93,9 @@ class BacktestEngine:
         self.logger = get_logger("backtest_engine")
         self.performance_analyzer = PerformanceAnalyzer()
         
+        # 手续费与滑点合并为单一成本费率
+        self._total_cost_rate = self.config.commission_rate + self.config.slippage_rate
+        
         # 回测状态
         self.reset()
     
@@ -64,10 +103,76 @@ class BacktestEngine:
         """重置回测状态"""
         self.current_cash = self.config.initial_capital
         self.positions: Dict[str, Position] = {}
-        self.trades: List[Trade] = []
-        self.portfolio_values: List[float] = []
-        self.timestamps: List[pd.Timestamp] = []
-        self.returns: List[float] = []
+        
+        # 单标的模式下的标量持仓状态, 代替逐bar的持仓字典查找
+        self._single_symbol = False
+        self._pos_size = 0.0
+        self._pos_entry = 0.0
+        self._pos_entry_time = None
+        self._reset_trade_buffer(0)
+        self.portfolio_values: np.ndarray = np.empty(0)
+        self.timestamps: pd.Index = pd.Index([])
+        self.returns: np.ndarray = np.empty(0)
+    
+    def _reset_trade_buffer(self, capacity: int):
+        """重置交易记录缓冲区 (每个字段一个连续数组, 代替Trade对象列表)"""
+        self._n_trades = 0
+        self._trade_type = np.empty(capacity, dtype=np.int8)  # 1: 买入, -1: 卖出
+        self._trade_size = np.empty(capacity, dtype=np.float64)
+        self._trade_price = np.empty(capacity, dtype=np.float64)
+        self._trade_commission = np.empty(capacity, dtype=np.float64)
+        self._trade_symbol = np.empty(capacity, dtype=object)
+        self._trade_timestamp = np.empty(capacity, dtype=object)
+    
+    def _record_trade(
+        self,
+        symbol: str,
+        side: int,
+        size: float,
+        price: float,
+        timestamp: pd.Timestamp,
+        commission: float
+    ):
+        """写入一笔交易记录, 缓冲区满时按倍数扩容"""
+        n = self._n_trades
+        if n == len(self._trade_size):
+            capacity = max(2 * n, 16)
+            for name in TRADE_BUFFER_FIELDS:
+                old = getattr(self, name)
+                grown = np.empty(capacity, dtype=old.dtype)
+                grown[:n] = old[:n]
+                setattr(self, name, grown)
+        
+        self._trade_type[n] = side
+        self._trade_size[n] = size
+        self._trade_price[n] = price
+        self._trade_commission[n] = commission
+        self._trade_symbol[n] = symbol
+        self._trade_timestamp[n] = timestamp
+        self._n_trades = n + 1
+    
+    @property
+    def trades(self) -> List[Trade]:
+        """交易记录 (由交易缓冲区按需还原为Trade对象)"""
+        n = self._n_trades
+        return [
+            Trade(
+                symbol=symbol,
+                order_type=OrderType.BUY if side > 0 else OrderType.SELL,
+                size=float(size),
+                price=float(price),
+                timestamp=timestamp,
+                commission=float(commission)
+            )
+            for symbol, side, size, price, timestamp, commission in zip(
+                self._trade_symbol[:n],
+                self._trade_type[:n],
+                self._trade_size[:n],
+                self._trade_price[:n],
+                self._trade_timestamp[:n],
+                self._trade_commission[:n]
+            )
+        ]
     
     def run_factor_backtest(
         self,
@@ -87,62 +192,156 @@ class BacktestEngine:
             回测结果字典
         """
         try:
-            if strategy_func is None:
-                strategy_func = self._simple_factor_strategy
-            
-            # 重置回测状态
-            self.reset()
-            
-            # 对齐因子值和价格数据
-            aligned_data = pd.concat([factor_values, price_data], axis=1).dropna()
-            
-            if aligned_data.empty or len(aligned_data) < 2:
-                return {"error": "数据不足进行回测"}
-            
-            factor_col = aligned_data.columns[0]
-            
-            # 逐日回测
-            for i, (timestamp, row) in enumerate(aligned_data.iterrows()):
-                if i == 0:
-                    # 初始化
-                    self.timestamps.append(timestamp)
-                    self.portfolio_values.append(self.config.initial_capital)
-                    continue
-                
-                # 获取当前因子值和价格信息
-                current_factor = row[factor_col]
-                current_prices = {
-                    'open': row['open'],
-                    'high': row['high'], 
-                    'low': row['low'],
-                    'close': row['close'],
-                    'volume': row.get('volume', 0)
-                }
-                
-                # 执行策略
-                signal = strategy_func(current_factor, current_prices, i)
-                
-                # 执行交易
-                if signal != 0:
-                    self._execute_trade("SYMBOL", signal, current_prices['close'], timestamp)
-                
-                # 更新投资组合价值
-                portfolio_value = self._calculate_portfolio_value(current_prices['close'])
-                self.portfolio_values.append(portfolio_value)
-                self.timestamps.append(timestamp)
-                
-                # 计算收益率
-                if len(self.portfolio_values) > 1:
-                    daily_return = (portfolio_value - self.portfolio_values[-2]) / self.portfolio_values[-2]
-                    self.returns.append(daily_return)
-            
-            # 生成回测结果
+            return self._run_factor_backtest(factor_values, price_data, strategy_func)
+        except Exception as e:
+            self.logger.error(f"因子回测失败: {e}")
+            return {"error": str(e)}
+    
+    def _run_factor_backtest(
+        self,
+        factor_values: pd.Series,
+        price_data: pd.DataFrame,
+        strategy_func: Optional[Callable]
+    ) -> Dict:
+        """run_factor_backtest的实现 (不含异常处理, 由公开入口统一捕获)"""
+        # 重置回测状态
+        self.reset()
+        
+        # 对齐因子值和价格数据
+        aligned_data = pd.concat([factor_values.rename(FACTOR_COLUMN), price_data], axis=1).dropna()
+        
+        if aligned_data.empty or len(aligned_data) < 2:
+            return {"error": "数据不足进行回测"}
+        
+        factor_col = FACTOR_COLUMN
+        
+        # 默认策略走编译后的内核, 自定义策略走Python逐日循环
+        if strategy_func is None:
+            self._run_simple_strategy_kernel(aligned_data, factor_col)
             return self._generate_backtest_results()
+        
+        # 一次性提取为float64数组, 避免iterrows逐行构造Series
+        cols = aligned_data.reindex(
+            columns=[factor_col, 'open', 'high', 'low', 'close', 'volume']
+        ).to_numpy(dtype=np.float64, na_value=np.nan)
+        timestamps = aligned_data.index
+        
+        # 循环边界已知, 预分配结果数组
+        n = len(cols)
+        self.timestamps = timestamps
+        self.portfolio_values = np.empty(n)
+        self.returns = np.empty(n - 1)
+        self.portfolio_values[0] = self.config.initial_capital
+        self._reset_trade_buffer(n)
+        self._single_symbol = True
+        
+        # 逐日回测
+        for i in range(1, n):
+            timestamp = timestamps[i]
+        
+            # 获取当前因子值和价格信息
+            factor_i, open_i, high_i, low_i, close_i, volume_i = cols[i]
+            current_factor = float(factor_i)
+            current_prices = {
+                'open': float(open_i),
+                'high': float(high_i), 
+                'low': float(low_i),
+                'close': float(close_i),
+                'volume': float(volume_i) if math.isfinite(volume_i) else 0.0
+            }
+        
+            # 执行策略
+            signal = strategy_func(current_factor, current_prices, i)
+        
+            # 执行交易
+            if signal != 0:
+                self._execute_trade("SYMBOL", signal, current_prices['close'], timestamp)
+        
+            # 更新投资组合价值
+            portfolio_value = self._calculate_portfolio_value(current_prices['close'])
+            self.portfolio_values[i] = portfolio_value
+        
+            # 计算收益率
+            prev_value = self.portfolio_values[i - 1]
+            self.returns[i - 1] = (portfolio_value - prev_value) / prev_value
+        
+        # 期末标量持仓写回持仓字典
+        self._single_symbol = False
+        if self._pos_size > 0:
+            self.positions["SYMBOL"] = Position(
+                symbol="SYMBOL",
+                size=self._pos_size,
+                entry_price=self._pos_entry,
+                entry_time=self._pos_entry_time
+            )
+        
+        # 生成回测结果
+        return self._generate_backtest_results()
+    
+    def run_factor_backtest_panel(
+        self,
+        factor_df: pd.DataFrame,
+        close_df: pd.DataFrame
+    ) -> Dict:
+        """
+        多标的因子回测 (面板数据, 整体以T×S数组运算完成)
+        
+        每个标的按简单因子策略取 -1/0/1 信号, 次日收益按等权合成组合收益,
+        持仓变动时按手续费+滑点扣减成本
+        
+        Args:
+            factor_df: 因子值面板 (行: 时间, 列: 标的)
+            close_df: 收盘价面板 (行: 时间, 列: 标的)
             
+        Returns:
+            回测结果字典
+        """
+        try:
+            return self._run_factor_backtest_panel(factor_df, close_df)
         except Exception as e:
-            self.logger.error(f"因子回测失败: {e}")
+            self.logger.error(f"多标的因子回测失败: {e}")
             return {"error": str(e)}
     
+    def _run_factor_backtest_panel(self, factor_df: pd.DataFrame, close_df: pd.DataFrame) -> Dict:
+        """run_factor_backtest_panel的实现 (不含异常处理, 由公开入口统一捕获)"""
+        # 因子面板对齐到价格面板的时间和标的
+        factor_df = factor_df.reindex(index=close_df.index, columns=close_df.columns)
+        if len(close_df) < 2 or close_df.shape[1] == 0:
+            return {"error": "数据不足进行回测"}
+        
+        factor = factor_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        close = close_df.to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        # 信号: 与单标的简单策略一致, NaN比较结果为False即无信号
+        signals = (factor > SIGNAL_THRESHOLD).astype(np.int8) - (factor < -SIGNAL_THRESHOLD).astype(np.int8)
+        
+        # 收益率: 缺失价格处收益记为0
+        asset_returns = np.nan_to_num(close[1:] / close[:-1] - 1.0, nan=0.0, posinf=0.0, neginf=0.0)
+        
+        # t时刻的信号决定(t, t+1]区间的持仓, 仓位变动时扣减交易成本
+        positions = signals[:-1]
+        turnover = np.abs(np.diff(positions, axis=0, prepend=np.zeros((1, positions.shape[1]), dtype=np.int8)))
+        pnl = positions * asset_returns - turnover * self._total_cost_rate
+        
+        # 等权合成组合收益
+        portfolio_returns = pnl.mean(axis=1)
+        portfolio_values = np.empty(len(close))
+        portfolio_values[0] = self.config.initial_capital
+        portfolio_values[1:] = self.config.initial_capital * (1.0 + compound_returns(portfolio_returns, cumulative=True))
+        
+        returns_series = pd.Series(portfolio_returns, index=close_df.index[1:])
+        portfolio_series = pd.Series(portfolio_values, index=close_df.index)
+        
+        return {
+            'performance_stats': self.performance_analyzer.comprehensive_analysis(returns_series),
+            'portfolio_value': portfolio_series,
+            'returns': returns_series,
+            'symbol_returns': pd.DataFrame(pnl, index=close_df.index[1:], columns=close_df.columns),
+            'turnover': float(turnover.sum(axis=1).mean()),
+            'final_value': float(portfolio_values[-1]),
+            'total_return': float(portfolio_values[-1] / self.config.initial_capital - 1)
+        }
+    
     def run_quantile_backtest(
         self,
         factor_values: pd.Series,
@@ -163,93 +362,148 @@ class BacktestEngine:
             分层回测结果
         """
         try:
-            # 对齐数据
-            aligned_data = pd.concat([factor_values, price_data['close']], axis=1).dropna()
-            if len(aligned_data) < quantiles * 2:
-                return {"error": "数据不足进行分层"}
-            
-            factor_col = aligned_data.columns[0]
-            price_col = aligned_data.columns[1]
-            
-            # 计算收益率
-            returns = aligned_data[price_col].pct_change().dropna()
-            
-            results = {}
-            
-            # 分层回测
-            for i in range(len(aligned_data) - 1):
-                current_data = aligned_data.iloc[i]
-                next_return = returns.iloc[i] if i < len(returns) else 0
-                
-                # 因子分层
-                factor_value = current_data[factor_col]
-                
-                # 这里简化处理，实际应该基于rolling window进行分层
-                # 假设因子值越高，下期收益越高
-                if pd.notna(factor_value) and pd.notna(next_return):
-                    timestamp = aligned_data.index[i]
-                    
-                    if timestamp not in results:
-                        results[timestamp] = {
-                            'factor_value': factor_value,
-                            'next_return': next_return
-                        }
-            
-            # 计算分层表现
-            factor_returns_df = pd.DataFrame(results).T
-            
-            if len(factor_returns_df) == 0:
-                return {"error": "无有效数据"}
-            
-            # 按因子值分层
-            factor_returns_df['quantile'] = pd.qcut(
-                factor_returns_df['factor_value'], 
-                q=quantiles, 
-                labels=False,
-                duplicates='drop'
-            )
-            
-            # 计算各层收益率
-            quantile_stats = {}
-            for q in range(quantiles):
-                q_data = factor_returns_df[factor_returns_df['quantile'] == q]
-                if len(q_data) > 0:
-                    q_returns = pd.Series(q_data['next_return'].values)
-                    quantile_stats[f'Q{q+1}'] = {
-                        'mean_return': q_returns.mean(),
-                        'std_return': q_returns.std(),
-                        'sharpe_ratio': self.performance_analyzer.calculate_sharpe_ratio(q_returns),
-                        'total_return': (1 + q_returns).prod() - 1,
-                        'count': len(q_returns)
-                    }
-            
-            # 多空组合
-            if long_short and len(quantile_stats) >= 2:
-                try:
-                    high_q = factor_returns_df[factor_returns_df['quantile'] == quantiles - 1]
-                    low_q = factor_returns_df[factor_returns_df['quantile'] == 0]
-                    
-                    if len(high_q) > 0 and len(low_q) > 0:
-                        ls_returns = pd.Series(high_q['next_return'].values) - pd.Series(low_q['next_return'].values)
-                        quantile_stats['LongShort'] = {
-                            'mean_return': ls_returns.mean(),
-                            'std_return': ls_returns.std(),
-                            'sharpe_ratio': self.performance_analyzer.calculate_sharpe_ratio(ls_returns),
-                            'total_return': (1 + ls_returns).prod() - 1,
-                            'count': len(ls_returns)
-                        }
-                except Exception as e:
-                    self.logger.warning(f"计算多空组合失败: {e}")
-            
-            return {
-                'quantile_stats': quantile_stats,
-                'factor_ic': factor_returns_df[['factor_value', 'next_return']].corr().iloc[0, 1]
-            }
-            
+            return self._run_quantile_backtest(factor_values, price_data, quantiles, long_short)
         except Exception as e:
             self.logger.error(f"分层回测失败: {e}")
             return {"error": str(e)}
     
+    def _run_quantile_backtest(
+        self,
+        factor_values: pd.Series,
+        price_data: pd.DataFrame,
+        quantiles: int,
+        long_short: bool
+    ) -> Dict:
+        """run_quantile_backtest的实现 (不含异常处理, 由公开入口统一捕获)"""
+        # 对齐数据
+        aligned_data = pd.concat([factor_values.rename(FACTOR_COLUMN), price_data['close']], axis=1).dropna()
+        if len(aligned_data) < quantiles * 2:
+            return {"error": "数据不足进行分层"}
+        
+        factor_col = FACTOR_COLUMN
+        price_col = 'close'
+        
+        # 计算收益率
+        returns = aligned_data[price_col].pct_change().dropna().to_numpy(dtype=np.float64)
+        
+        # 第i期因子值对应第i期到第i+1期的收益率 (收益率不足时记为0), 时间戳重复时保留首条
+        n = len(aligned_data) - 1
+        next_returns = np.zeros(n)
+        m = min(n, len(returns))
+        next_returns[:m] = returns[:m]
+        keep = ~aligned_data.index[:n].duplicated() & ~np.isnan(next_returns)
+        factor_arr = aligned_data[factor_col].to_numpy(dtype=np.float64)[:n][keep]
+        next_returns = next_returns[keep]
+        
+        if len(factor_arr) == 0:
+            return {"error": "无有效数据"}
+        
+        # 按因子值分层, 稳定排序后每层是一段连续切片
+        labels = qcut_labels(factor_arr, quantiles)
+        order = np.argsort(labels, kind='stable')
+        sorted_returns = next_returns[order]
+        counts = np.bincount(labels, minlength=quantiles)
+        present = np.flatnonzero(counts)
+        starts = np.searchsorted(labels[order], present)
+        ends = starts + counts[present]
+        
+        # 计算各层收益率
+        n_q = counts[present].astype(np.float64)
+        mean_returns = np.add.reduceat(sorted_returns, starts) / n_q
+        deviations = sorted_returns - np.repeat(mean_returns, counts[present])
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std_returns = np.sqrt(np.add.reduceat(deviations * deviations, starts) / (n_q - 1))
+        std_returns[n_q < 2] = np.nan
+        # 单期价格收益率不低于-100%, 可直接在对数空间分段求和
+        total_returns = np.expm1(np.add.reduceat(np.log1p(sorted_returns), starts))
+        sharpe_ratios = self._annualized_sharpe(mean_returns, std_returns)
+        
+        quantile_stats = {
+            f'Q{int(q)+1}': {
+                'mean_return': float(mean_returns[j]),
+                'std_return': float(std_returns[j]),
+                'sharpe_ratio': float(sharpe_ratios[j]),
+                'total_return': float(total_returns[j]),
+                'count': int(counts[q])
+            }
+            for j, q in enumerate(present)
+        }
+        
+        # 多空组合
+        if long_short and len(quantile_stats) >= 2:
+            try:
+                if counts[quantiles - 1] and counts[0]:
+                    high_q = sorted_returns[starts[-1]:ends[-1]]
+                    low_q = sorted_returns[starts[0]:ends[0]]
+                    # 多空两端按位置配对, 较长一端多出的部分不参与统计
+                    paired = min(len(high_q), len(low_q))
+                    ls_returns = high_q[:paired] - low_q[:paired]
+                    ls_mean = float(ls_returns.mean())
+                    ls_std = float(ls_returns.std(ddof=1)) if paired > 1 else np.nan
+                    quantile_stats['LongShort'] = {
+                        'mean_return': ls_mean,
+                        'std_return': ls_std,
+                        'sharpe_ratio': float(self._annualized_sharpe(ls_mean, ls_std)),
+                        'total_return': float(compound_returns(ls_returns)),
+                        'count': max(len(high_q), len(low_q))
+                    }
+            except Exception as e:
+                self.logger.warning(f"计算多空组合失败: {e}")
+        
+        return {
+            'quantile_stats': quantile_stats,
+            'factor_ic': float(np.corrcoef(factor_arr, next_returns)[0, 1]) if len(factor_arr) > 1 else np.nan
+        }
+    
+    @staticmethod
+    def _annualized_sharpe(mean_return, std_return, risk_free_rate: float = 0.02, periods_per_year: int = 252):
+        """年化夏普 (与 PerformanceAnalyzer.calculate_sharpe_ratio 口径一致, 波动为0时返回NaN)"""
+        annual_vol = np.asarray(std_return, dtype=np.float64) * np.sqrt(periods_per_year)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            sharpe = (np.asarray(mean_return) * periods_per_year - risk_free_rate) / annual_vol
+        return np.where(annual_vol == 0, np.nan, sharpe)
+    
+    def _run_simple_strategy_kernel(self, aligned_data: pd.DataFrame, factor_col) -> None:
+        """用编译内核执行简单因子策略, 并还原交易记录和持仓"""
+        factor = aligned_data[factor_col].to_numpy(dtype=np.float64)
+        close = aligned_data['close'].to_numpy(dtype=np.float64)
+        timestamps = aligned_data.index
+        
+        pv, rets, trade_log, n_trades, cash, pos_size, pos_entry, pos_entry_idx = \
+            _run_factor_backtest_kernel(
+                factor,
+                close,
+                float(self.config.initial_capital),
+                float(self.config.commission_rate),
+                float(self.config.slippage_rate),
+                SIGNAL_THRESHOLD,
+                -SIGNAL_THRESHOLD
+            )
+        
+        self.current_cash = float(cash)
+        self.portfolio_values = pv
+        self.returns = rets
+        self.timestamps = timestamps
+        
+        # 内核的交易记录直接写入交易缓冲区, Trade对象按需还原
+        trade_log = trade_log[:n_trades]
+        bars = trade_log[:, TRADE_BAR].astype(np.intp)
+        self._n_trades = int(n_trades)
+        self._trade_type = trade_log[:, TRADE_SIDE].astype(np.int8)
+        self._trade_size = trade_log[:, TRADE_SIZE].copy()
+        self._trade_price = close[bars]
+        self._trade_commission = trade_log[:, TRADE_COST].copy()
+        self._trade_symbol = np.full(self._n_trades, "SYMBOL", dtype=object)
+        self._trade_timestamp = timestamps[bars].astype(object).to_numpy()
+        
+        if pos_size > 0:
+            self.positions["SYMBOL"] = Position(
+                symbol="SYMBOL",
+                size=float(pos_size),
+                entry_price=float(pos_entry),
+                entry_time=timestamps[int(pos_entry_idx)]
+            )
+    
     def _simple_factor_strategy(self, factor_value: float, prices: Dict, day: int) -> float:
         """
         简单因子策略
@@ -262,97 +516,107 @@ class BacktestEngine:
         Returns:
             交易信号 (1: 买入, -1: 卖出, 0: 无操作)
         """
-        if pd.isna(factor_value):
+        if not math.isfinite(factor_value):
             return 0
         
-        # 简单策略：因子值大于0买入，小于0卖出
-        if factor_value > 0.02:  # 因子值阈值
-            return 1
-        elif factor_value < -0.02:
-            return -1
-        else:
-            return 0
+        # 简单策略：因子值大于阈值买入，小于负阈值卖出 (无分支写法)
+        return (factor_value > SIGNAL_THRESHOLD) - (factor_value < -SIGNAL_THRESHOLD)
     
     def _execute_trade(self, symbol: str, signal: float, price: float, timestamp: pd.Timestamp):
         """执行交易"""
-        try:
-            # 计算交易成本
-            commission = abs(signal) * price * self.config.commission_rate
-            slippage = abs(signal) * price * self.config.slippage_rate
-            total_cost = commission + slippage
-            
-            if signal > 0:  # 买入
-                # 检查现金是否足够
-                required_cash = signal * price + total_cost
-                if required_cash <= self.current_cash:
-                    # 执行买入
-                    self.current_cash -= required_cash
-                    
-                    if symbol in self.positions:
-                        # 更新持仓
-                        pos = self.positions[symbol]
-                        total_size = pos.size + signal
-                        total_value = pos.size * pos.entry_price + signal * price
-                        pos.size = total_size
-                        pos.entry_price = total_value / total_size if total_size != 0 else price
-                    else:
-                        # 新建持仓
-                        self.positions[symbol] = Position(
-                            symbol=symbol,
-                            size=signal,
-                            entry_price=price,
-                            entry_time=timestamp
-                        )
-                    
-                    # 记录交易
-                    self.trades.append(Trade(
+        if self._single_symbol:
+            self._execute_trade_single(symbol, signal, price, timestamp)
+            return
+        
+        # 计算交易成本 (手续费+滑点)
+        total_cost = abs(signal) * price * self._total_cost_rate
+        
+        if signal > 0:  # 买入
+            # 检查现金是否足够
+            required_cash = signal * price + total_cost
+            if required_cash <= self.current_cash:
+                # 执行买入
+                self.current_cash -= required_cash
+                
+                if symbol in self.positions:
+                    # 更新持仓
+                    pos = self.positions[symbol]
+                    total_size = pos.size + signal
+                    total_value = pos.size * pos.entry_price + signal * price
+                    pos.size = total_size
+                    pos.entry_price = total_value / total_size if total_size != 0 else price
+                else:
+                    # 新建持仓
+                    self.positions[symbol] = Position(
                         symbol=symbol,
-                        order_type=OrderType.BUY,
                         size=signal,
-                        price=price,
-                        timestamp=timestamp,
-                        commission=total_cost
-                    ))
+                        entry_price=price,
+                        entry_time=timestamp
+                    )
+                
+                # 记录交易
+                self._record_trade(symbol, 1, signal, price, timestamp, total_cost)
+        
+        elif signal < 0:  # 卖出
+            if symbol in self.positions and self.positions[symbol].size > 0:
+                # 执行卖出
+                sell_size = min(abs(signal), self.positions[symbol].size)
+                proceeds = sell_size * price - total_cost
+                self.current_cash += proceeds
+                
+                # 更新持仓
+                self.positions[symbol].size -= sell_size
+                if self.positions[symbol].size <= 0:
+                    del self.positions[symbol]
+                
+                # 记录交易
+                self._record_trade(symbol, -1, sell_size, price, timestamp, total_cost)
+    
+    def _execute_trade_single(self, symbol: str, signal: float, price: float, timestamp: pd.Timestamp):
+        """单标的模式下执行交易, 只读写标量持仓状态"""
+        total_cost = abs(signal) * price * self._total_cost_rate
+        
+        if signal > 0:  # 买入
+            required_cash = signal * price + total_cost
+            if required_cash <= self.current_cash:
+                self.current_cash -= required_cash
+                
+                if self._pos_size > 0:
+                    total_size = self._pos_size + signal
+                    total_value = self._pos_size * self._pos_entry + signal * price
+                    self._pos_entry = total_value / total_size if total_size != 0 else price
+                    self._pos_size = total_size
+                else:
+                    self._pos_size = signal
+                    self._pos_entry = price
+                    self._pos_entry_time = timestamp
+                
+                self._record_trade(symbol, 1, signal, price, timestamp, total_cost)
+        
+        elif signal < 0 and self._pos_size > 0:  # 卖出
+            sell_size = min(abs(signal), self._pos_size)
+            self.current_cash += sell_size * price - total_cost
             
-            elif signal < 0:  # 卖出
-                if symbol in self.positions and self.positions[symbol].size > 0:
-                    # 执行卖出
-                    sell_size = min(abs(signal), self.positions[symbol].size)
-                    proceeds = sell_size * price - total_cost
-                    self.current_cash += proceeds
-                    
-                    # 更新持仓
-                    self.positions[symbol].size -= sell_size
-                    if self.positions[symbol].size <= 0:
-                        del self.positions[symbol]
-                    
-                    # 记录交易
-                    self.trades.append(Trade(
-                        symbol=symbol,
-                        order_type=OrderType.SELL,
-                        size=sell_size,
-                        price=price,
-                        timestamp=timestamp,
-                        commission=total_cost
-                    ))
-                    
-        except Exception as e:
-            self.logger.error(f"执行交易失败: {e}")
+            self._pos_size -= sell_size
+            if self._pos_size <= 0:
+                self._pos_size = 0.0
+                self._pos_entry = 0.0
+                self._pos_entry_time = None
+            
+            self._record_trade(symbol, -1, sell_size, price, timestamp, total_cost)
     
     def _calculate_portfolio_value(self, current_price: float) -> float:
         """计算投资组合总价值"""
-        try:
-            total_value = self.current_cash
-            
-            for symbol, position in self.positions.items():
-                position_value = position.size * current_price
-                total_value += position_value
-            
-            return total_value
-            
-        except Exception as e:
-            self.logger.error(f"计算投资组合价值失败: {e}")
-            return self.current_cash
+        if self._single_symbol:
+            return self.current_cash + self._pos_size * current_price
+        
+        total_value = self.current_cash
+        
+        for symbol, position in self.positions.items():
+            position_value = position.size * current_price
+            total_value += position_value
+        
+        return total_value
     
     def _generate_backtest_results(self) -> Dict:
         """生成回测结果"""
@@ -361,8 +625,8 @@ class BacktestEngine:
                 return {"error": "无交易数据"}
             
             # 转换为pandas Series
-            returns_series = pd.Series(self.returns, index=self.timestamps[1:])
-            portfolio_series = pd.Series(self.portfolio_values, index=self.timestamps)
+            returns_series = pd.Series(self.returns, index=self.timestamps[1:], copy=False)
+            portfolio_series = pd.Series(self.portfolio_values, index=self.timestamps, copy=False)
             
             # 计算性能指标
             performance_stats = self.performance_analyzer.comprehensive_analysis(returns_series)
@@ -376,8 +640,8 @@ class BacktestEngine:
                 'portfolio_value': portfolio_series,
                 'returns': returns_series,
                 'trades': self.trades,
-                'final_value': self.portfolio_values[-1] if self.portfolio_values else 0,
-                'total_return': (self.portfolio_values[-1] / self.config.initial_capital - 1) if self.portfolio_values else 0
+                'final_value': self.portfolio_values[-1] if len(self.portfolio_values) else 0,
+                'total_return': (self.portfolio_values[-1] / self.config.initial_capital - 1) if len(self.portfolio_values) else 0
             }
             
         except Exception as e:
@@ -387,20 +651,19 @@ class BacktestEngine:
     def _calculate_trade_stats(self) -> Dict:
         """计算交易统计"""
         try:
-            if not self.trades:
+            n = self._n_trades
+            if n == 0:
                 return {}
             
-            buy_trades = [t for t in self.trades if t.order_type == OrderType.BUY]
-            sell_trades = [t for t in self.trades if t.order_type == OrderType.SELL]
-            
-            total_commission = sum(t.commission for t in self.trades)
+            # 直接在交易缓冲区上做向量化聚合
+            buy_count = int(np.count_nonzero(self._trade_type[:n] == 1))
             
             return {
-                'total_trades': len(self.trades),
-                'buy_trades': len(buy_trades),
-                'sell_trades': len(sell_trades),
-                'total_commission': total_commission,
-                'avg_trade_size': np.mean([t.size for t in self.trades]) if self.trades else 0
+                'total_trades': n,
+                'buy_trades': buy_count,
+                'sell_trades': n - buy_count,
+                'total_commission': float(self._trade_commission[:n].sum()),
+                'avg_trade_size': float(self._trade_size[:n].mean())
             }
             
         except Exception as e:
@@ -0,0 +1,172 @@
+"""
+IC分析计算内核
+滚动相关系数等逐窗口递推的指标由numba编译为机器码
+"""
+
+import numpy as np
+from src.utils.jit import njit, prange
+
+
+@njit(cache=True, nogil=True)
+def _pearson(f, r):
+    """
+    全样本皮尔逊相关系数, 两遍法计算
+
+    与 ICAnalyzer._calculate_ic_np 的口径一致: 样本少于2时为NaN, 方差为0时为0
+    """
+    n = f.shape[0]
+    if n < 2:
+        return np.nan
+
+    f_mean = 0.0
+    r_mean = 0.0
+    for i in range(n):
+        f_mean += f[i]
+        r_mean += r[i]
+    f_mean /= n
+    r_mean /= n
+
+    cov = 0.0
+    f_var = 0.0
+    r_var = 0.0
+    for i in range(n):
+        df = f[i] - f_mean
+        dr = r[i] - r_mean
+        cov += df * dr
+        f_var += df * df
+        r_var += dr * dr
+
+    den = np.sqrt(f_var * r_var)
+    if not den > 0.0:
+        return 0.0
+    return cov / den
+
+
+@njit(cache=True, nogil=True)
+def _rolling_pearson(f, r, window):
+    """
+    滚动皮尔逊相关系数
+
+    均值与二阶(协)中心矩以Welford算法增量加入/移出窗口, 每步O(1);
+    窗口内任一序列完全不变时相关系数精确取0, 不受增量更新舍入残差影响
+
+    Args:
+        f: 因子数组 (float64, 已对齐且无缺失值)
+        r: 收益率数组 (float64, 已对齐且无缺失值)
+        window: 窗口长度
+
+    Returns:
+        与输入等长的数组, 前 window-1 期为NaN, 退化窗口为0
+    """
+    n = f.shape[0]
+    out = np.full(n, np.nan)
+
+    count = 0
+    f_mean = 0.0
+    r_mean = 0.0
+    f_ss = 0.0
+    r_ss = 0.0
+    cov = 0.0
+    # 以当前位置结尾的连续相同值个数
+    f_run = 0
+    r_run = 0
+
+    for i in range(n):
+        x = f[i]
+        y = r[i]
+        count += 1
+        dx = x - f_mean
+        dy = y - r_mean
+        f_mean += dx / count
+        r_mean += dy / count
+        f_ss += dx * (x - f_mean)
+        r_ss += dy * (y - r_mean)
+        cov += dx * (y - r_mean)
+
+        f_run = f_run + 1 if i > 0 and x == f[i - 1] else 1
+        r_run = r_run + 1 if i > 0 and y == r[i - 1] else 1
+
+        if i >= window:
+            x = f[i - window]
+            y = r[i - window]
+            count -= 1
+            dx = x - f_mean
+            dy = y - r_mean
+            f_mean -= dx / count
+            r_mean -= dy / count
+            f_ss -= dx * (x - f_mean)
+            r_ss -= dy * (y - r_mean)
+            cov -= dx * (y - r_mean)
+
+        if i < window - 1:
+            continue
+
+        if f_run >= window or r_run >= window:
+            out[i] = 0.0
+            continue
+
+        den = np.sqrt(max(f_ss, 0.0) * max(r_ss, 0.0))
+        out[i] = cov / den if den > 0.0 else 0.0
+
+    return out
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _period_ic(f, forward, window):
+    """
+    多个前瞻期的IC、IC_IR、IC胜率与滚动IC, 各期 (列) 以prange并行
+
+    每列独立剔除因子或前瞻收益率缺失的样本; 口径与 calculate_ic /
+    calculate_rolling_ic / calculate_ic_ir 分别调用的结果一致
+
+    Args:
+        f: 因子数组 (float64, 长度N, 可含NaN)
+        forward: 前瞻收益率矩阵 (float64, N×P, 可含NaN)
+        window: 滚动IC窗口
+
+    Returns:
+        (IC数组, IC_IR数组, IC胜率数组, 滚动IC矩阵N×P);
+        滚动IC矩阵在缺失样本处为NaN, 有效样本少于window时整列为NaN
+    """
+    n, n_periods = forward.shape
+    ics = np.full(n_periods, np.nan)
+    ic_irs = np.full(n_periods, np.nan)
+    win_rates = np.zeros(n_periods)
+    rolling = np.full((n, n_periods), np.nan)
+
+    for j in prange(n_periods):
+        valid = np.empty(n, dtype=np.bool_)
+        n_valid = 0
+        for i in range(n):
+            valid[i] = not (np.isnan(f[i]) or np.isnan(forward[i, j]))
+            n_valid += valid[i]
+
+        f_valid = np.empty(n_valid)
+        r_valid = np.empty(n_valid)
+        k = 0
+        for i in range(n):
+            if valid[i]:
+                f_valid[k] = f[i]
+                r_valid[k] = forward[i, j]
+                k += 1
+
+        ics[j] = _pearson(f_valid, r_valid)
+        if n_valid < window:
+            continue
+
+        rolling_ic = _rolling_pearson(f_valid, r_valid, window)
+        k = 0
+        for i in range(n):
+            if valid[i]:
+                rolling[i, j] = rolling_ic[k]
+                k += 1
+
+        # 前 window-1 期之后滚动IC均非NaN; 胜率的分母含NaN期, 与 (rolling_ic > 0).mean() 一致
+        tail = rolling_ic[window - 1:]
+        win_rates[j] = (tail > 0.0).sum() / n_valid
+        if tail.shape[0] >= 2:
+            ic_std = tail.std() * np.sqrt(tail.shape[0] / (tail.shape[0] - 1.0))
+            if ic_std != 0.0:
+                ic_irs[j] = tail.mean() / ic_std
+
+    return ics, ic_irs, win_rates, rolling
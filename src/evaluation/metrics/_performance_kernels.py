@@ -0,0 +1,90 @@
+"""
+性能分析计算内核
+回撤等逐元素递推的指标由numba编译为机器码
+"""
+
+import numpy as np
+from src.utils.jit import njit
+
+
+@njit(cache=True)
+def _max_dd_scan(returns, drawdown_out):
+    """
+    单次扫描计算最大回撤
+
+    净值、峰值、回撤均为循环内的标量, NaN收益率跳过 (对应位置回撤为NaN),
+    与pandas cumprod/cummax跳过缺失值的行为一致
+
+    Args:
+        returns: 收益率数组 (float64)
+        drawdown_out: 与returns等长的输出数组, 写入逐期回撤
+
+    Returns:
+        (最大回撤, 峰值下标, 谷底下标, 期末净值); 无有效数据时下标为-1
+    """
+    equity = 1.0
+    peak = -np.inf
+    peak_idx = -1
+    max_dd = np.inf
+    start = -1
+    end = -1
+
+    for i in range(returns.shape[0]):
+        r = returns[i]
+        if np.isnan(r):
+            drawdown_out[i] = np.nan
+            continue
+        equity *= 1.0 + r
+        if equity > peak:
+            peak = equity
+            peak_idx = i
+        dd = equity / peak - 1.0
+        drawdown_out[i] = dd
+        if dd < max_dd:
+            max_dd = dd
+            start = peak_idx
+            end = i
+
+    if end < 0:
+        max_dd = np.nan
+    return max_dd, start, end, equity
+
+
+@njit(cache=True)
+def _rolling_max_drawdown(returns, window):
+    """
+    滚动最大回撤
+
+    每个窗口以窗口内首期收益后的净值为起点, 与 calculate_max_drawdown 的口径一致;
+    窗口内含NaN时结果为NaN
+
+    Args:
+        returns: 收益率数组 (float64)
+        window: 窗口长度
+
+    Returns:
+        与输入等长的数组, 前 window-1 个元素为NaN
+    """
+    n = returns.shape[0]
+    out = np.full(n, np.nan)
+
+    for end in range(window - 1, n):
+        equity = 1.0
+        peak = -np.inf
+        max_dd = 0.0
+        has_nan = False
+        for i in range(end - window + 1, end + 1):
+            r = returns[i]
+            if np.isnan(r):
+                has_nan = True
+                break
+            equity *= 1.0 + r
+            if equity > peak:
+                peak = equity
+            dd = equity / peak - 1.0
+            if dd < max_dd:
+                max_dd = dd
+        if not has_nan:
+            out[end] = max_dd
+
+    return out
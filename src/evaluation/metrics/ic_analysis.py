@@ -6,19 +6,72 @@ IC分析器
 
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from typing import Dict, List, Optional, Tuple
+from numpy.lib.stride_tricks import sliding_window_view
 from scipy import stats
 from src.utils.logger import get_logger
+from ._ic_kernels import _period_ic, _rolling_pearson
+
+try:
+    import numexpr as ne
+except ImportError:  # pragma: no cover - numexpr为可选依赖
+    ne = None
 
 logger = get_logger(__name__)
 
+# 数组元素数达到该值时才使用numexpr, 小数组上其调度开销得不偿失
+_NUMEXPR_MIN_SIZE = 10_000
+
+
+def qcut_labels(values: np.ndarray, quantiles: int) -> np.ndarray:
+    """
+    等频分层, 返回每个值所在层的整数标签 (0 ~ 层数-1)
+    
+    等价于 pd.qcut(values, q=quantiles, labels=False, duplicates='drop'),
+    但只需一次分位数计算和一次二分查找, 不构造IntervalIndex/Categorical
+    """
+    # 无法精确表示的分位点向上取整, 保证恰好落在样本点上的分位点不被低估
+    probs = np.linspace(0, 1, quantiles + 1)
+    np.putmask(probs, quantiles * probs != np.arange(quantiles + 1), np.nextafter(probs, 1))
+    edges = np.unique(np.quantile(values, probs))
+    # 区间为左开右闭, 第一层包含最小值
+    return np.searchsorted(edges[1:-1], values, side='left')
+
 
 class ICAnalyzer:
     """IC分析器"""
     
-    def __init__(self):
+    # 样本量达到该阈值时, 多期/多窗口计算分发到进程池并行执行
+    PARALLEL_MIN_SIZE = 500_000
+    
+    def __init__(self, max_workers: Optional[int] = None):
+        self.logger = get_logger("ic_analyzer")
+        self.max_workers = max_workers
+    
+    def __getstate__(self):
+        # 日志器持有文件句柄无法序列化, 进程池传参时在子进程中重新获取
+        state = self.__dict__.copy()
+        state.pop('logger', None)
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
         self.logger = get_logger("ic_analyzer")
     
+    def _map(self, func, n_samples: int, *iterables) -> List:
+        """
+        对各任务执行func; 样本量较大时使用进程池并行
+        
+        各期/各窗口的计算互不依赖, 但小数据上进程启动开销远大于计算本身
+        """
+        if n_samples < self.PARALLEL_MIN_SIZE:
+            return list(map(func, *iterables))
+        
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(func, *iterables))
+    
     def calculate_ic(
         self, 
         factor_values: pd.Series, 
@@ -42,20 +95,8 @@ class ICAnalyzer:
             if len(aligned_data) < 2:
                 return np.nan
             
-            factor_col = aligned_data.iloc[:, 0]
-            return_col = aligned_data.iloc[:, 1]
-            
-            # 计算相关系数
-            if method == "pearson":
-                ic, _ = stats.pearsonr(factor_col, return_col)
-            elif method == "spearman":
-                ic, _ = stats.spearmanr(factor_col, return_col)
-            elif method == "kendall":
-                ic, _ = stats.kendalltau(factor_col, return_col)
-            else:
-                raise ValueError(f"不支持的方法: {method}")
-            
-            return ic if not np.isnan(ic) else 0.0
+            factor_arr, return_arr = self._to_arrays(aligned_data)
+            return self._calculate_ic_np(factor_arr, return_arr, method)
             
         except Exception as e:
             self.logger.error(f"计算IC失败: {e}")
@@ -86,24 +127,120 @@ class ICAnalyzer:
             if len(aligned_data) < window:
                 return pd.Series(dtype=float)
             
-            # 计算滚动IC
-            rolling_ic = pd.Series(index=aligned_data.index, dtype=float)
-            
-            for i in range(window - 1, len(aligned_data)):
-                window_data = aligned_data.iloc[i - window + 1:i + 1]
-                factor_window = window_data.iloc[:, 0]
-                return_window = window_data.iloc[:, 1]
-                
-                # 计算相关系数
-                ic_value = self.calculate_ic(factor_window, return_window, method)
-                rolling_ic.iloc[i] = ic_value
-            
-            return rolling_ic
+            factor_arr, return_arr = self._to_arrays(aligned_data)
+            return pd.Series(
+                self._rolling_ic_np(factor_arr, return_arr, window, method),
+                index=aligned_data.index
+            )
             
         except Exception as e:
             self.logger.error(f"计算滚动IC失败: {e}")
             return pd.Series(dtype=float)
     
+    @staticmethod
+    def _to_arrays(aligned_data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """将已对齐的(因子, 收益率)两列数据转换为float64数组"""
+        return (
+            aligned_data.iloc[:, 0].to_numpy(dtype=np.float64),
+            aligned_data.iloc[:, 1].to_numpy(dtype=np.float64)
+        )
+    
+    def _calculate_ic_np(self, f: np.ndarray, r: np.ndarray, method: str = "pearson") -> float:
+        """在已对齐且无缺失值的数组上计算IC"""
+        if len(f) < 2:
+            return np.nan
+        
+        # 计算相关系数 (不需要p值, pearson/spearman直接用NumPy计算)
+        if method == "pearson":
+            ic = self._rowwise_corr(f[np.newaxis], r[np.newaxis])[0]
+        elif method == "spearman":
+            ic = self._rowwise_corr(stats.rankdata(f)[np.newaxis], stats.rankdata(r)[np.newaxis])[0]
+        elif method == "kendall":
+            ic = stats.kendalltau(f, r)[0]
+        else:
+            raise ValueError(f"不支持的方法: {method}")
+        
+        return ic if not np.isnan(ic) else 0.0
+    
+    def _rolling_ic_np(
+        self,
+        f: np.ndarray,
+        r: np.ndarray,
+        window: int = 30,
+        method: str = "pearson"
+    ) -> np.ndarray:
+        """在已对齐且无缺失值的数组上计算滚动IC, 前window-1个位置为NaN"""
+        n = len(f)
+        if n < window:
+            return np.empty(0)
+        
+        rolling_ic = np.full(n, np.nan)
+        
+        if method == "pearson":
+            rolling_ic[:] = _rolling_pearson(
+                np.ascontiguousarray(f, dtype=np.float64), np.ascontiguousarray(r, dtype=np.float64), window
+            )
+        elif method == "spearman":
+            # 每个窗口内独立排名, 再按行计算皮尔逊相关
+            f_ranks = stats.rankdata(sliding_window_view(f, window), axis=1)
+            r_ranks = stats.rankdata(sliding_window_view(r, window), axis=1)
+            rolling_ic[window - 1:] = self._rowwise_corr(f_ranks, r_ranks)
+        else:
+            for i in range(window - 1, n):
+                rolling_ic[i] = self._calculate_ic_np(
+                    f[i - window + 1:i + 1], r[i - window + 1:i + 1], method
+                )
+        
+        # 与calculate_ic保持一致: 退化窗口(如常数序列)的IC记为0
+        tail = rolling_ic[window - 1:]
+        tail[np.isnan(tail)] = 0.0
+        
+        return rolling_ic
+    
+    @staticmethod
+    def _rowwise_corr(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """逐行计算两个二维数组的皮尔逊相关系数, 方差为0的行返回NaN"""
+        a = a - a.mean(axis=1, keepdims=True)
+        b = b - b.mean(axis=1, keepdims=True)
+        num = (a * b).sum(axis=1)
+        den = np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+        return np.divide(num, den, out=np.full_like(num, np.nan), where=den > 0)
+    
+    @staticmethod
+    def _masked_column_corr(f: np.ndarray, R: np.ndarray) -> np.ndarray:
+        """
+        计算向量f与矩阵R每一列的皮尔逊相关系数, 每列独立剔除缺失值
+        
+        与逐列调用calculate_ic的结果一致: 有效样本少于2时为NaN, 方差为0时为0
+        """
+        valid = ~np.isnan(R) & ~np.isnan(f)[:, np.newaxis]
+        n = valid.sum(axis=0)
+        safe_n = np.maximum(n, 1)
+        f_col = f[:, np.newaxis]
+        
+        if ne is not None and valid.size >= _NUMEXPR_MIN_SIZE:
+            # numexpr将减均值/掩码/乘积融合为单次多线程遍历
+            f_mean = ne.evaluate("sum(where(valid, f_col, 0.0), axis=0)") / safe_n
+            R_mean = ne.evaluate("sum(where(valid, R, 0.0), axis=0)") / safe_n
+            f_centered = ne.evaluate("where(valid, f_col - f_mean, 0.0)")
+            R_centered = ne.evaluate("where(valid, R - R_mean, 0.0)")
+            num = ne.evaluate("sum(f_centered * R_centered, axis=0)")
+            den = np.sqrt(
+                ne.evaluate("sum(f_centered * f_centered, axis=0)")
+                * ne.evaluate("sum(R_centered * R_centered, axis=0)")
+            )
+        else:
+            f_masked = np.where(valid, f_col, 0.0)
+            R_masked = np.where(valid, R, 0.0)
+            f_centered = np.where(valid, f_masked - f_masked.sum(axis=0) / safe_n, 0.0)
+            R_centered = np.where(valid, R_masked - R_masked.sum(axis=0) / safe_n, 0.0)
+            
+            num = (f_centered * R_centered).sum(axis=0)
+            den = np.sqrt((f_centered * f_centered).sum(axis=0) * (R_centered * R_centered).sum(axis=0))
+        ic = np.divide(num, den, out=np.zeros_like(num), where=den > 0)
+        ic[n < 2] = np.nan
+        return ic
+    
     def calculate_ic_ir(
         self,
         factor_values: pd.Series,
@@ -125,22 +262,77 @@ class ICAnalyzer:
         """
         try:
             rolling_ic = self.calculate_rolling_ic(factor_values, returns, window, method)
+            return self._ic_ir_from_rolling(rolling_ic)
             
-            if len(rolling_ic.dropna()) < 2:
-                return np.nan
+        except Exception as e:
+            self.logger.error(f"计算IC_IR失败: {e}")
+            return np.nan
+    
+    def calculate_period_ic(
+        self,
+        factor_values: pd.Series,
+        returns: pd.Series,
+        periods: List[int] = [1, 3, 5, 10, 20],
+        window: int = 30
+    ) -> Dict:
+        """
+        计算多个前瞻期的IC、IC_IR、IC胜率与滚动IC (皮尔逊口径)
+        
+        因子与收益率只对齐一次, 各期由编译内核在一次调用中完成计算,
+        结果与逐期调用 calculate_ic / calculate_rolling_ic / calculate_ic_ir 一致
+        
+        Args:
+            factor_values: 因子值序列
+            returns: 收益率序列
+            periods: 预测期数列表
+            window: 滚动IC窗口
             
-            ic_mean = rolling_ic.mean()
-            ic_std = rolling_ic.std()
+        Returns:
+            {'period_N': {'ic', 'ic_ir', 'ic_win_rate', 'rolling_ic'}} 字典
+        """
+        try:
+            factor_arr = factor_values.reindex(returns.index).to_numpy(dtype=np.float64)
+            forward = self._forward_returns_np(returns.to_numpy(dtype=np.float64), periods)
+            ics, ic_irs, win_rates, rolling = _period_ic(factor_arr, forward, window)
             
-            if ic_std == 0:
-                return np.nan
+            # 各期有效样本掩码一次性按矩阵计算, 各列为零拷贝视图
+            valid_matrix = ~np.isnan(forward) & ~np.isnan(factor_arr)[:, np.newaxis]
+            valid_counts = valid_matrix.sum(axis=0)
+            
+            results = {}
+            for j, period in enumerate(periods):
+                valid = valid_matrix[:, j]
+                if valid_counts[j] < window:
+                    rolling_ic = pd.Series(dtype=float)
+                else:
+                    rolling_ic = pd.Series(rolling[valid, j], index=returns.index[valid])
+                
+                results[f'period_{period}'] = {
+                    'ic': ics[j],
+                    'ic_ir': ic_irs[j],
+                    'ic_win_rate': win_rates[j],
+                    'rolling_ic': rolling_ic
+                }
             
-            ic_ir = ic_mean / ic_std
-            return ic_ir
+            return results
             
         except Exception as e:
-            self.logger.error(f"计算IC_IR失败: {e}")
+            self.logger.error(f"计算多期IC失败: {e}")
+            return {}
+    
+    @staticmethod
+    def _ic_ir_from_rolling(rolling_ic: pd.Series) -> float:
+        """由滚动IC序列计算IC_IR"""
+        if len(rolling_ic.dropna()) < 2:
             return np.nan
+        
+        ic_mean = rolling_ic.mean()
+        ic_std = rolling_ic.std()
+        
+        if ic_std == 0:
+            return np.nan
+        
+        return ic_mean / ic_std
     
     def calculate_ic_stats(
         self,
@@ -160,37 +352,53 @@ class ICAnalyzer:
             IC统计结果字典
         """
         try:
-            results = {}
+            factor_arrs, return_arrs = [], []
             
             for period in periods:
-                # 计算前瞻收益率
+                # 计算前瞻收益率, 每期只对齐一次
                 forward_returns = returns.shift(-period)
-                
-                # 计算IC
-                ic = self.calculate_ic(factor_values, forward_returns)
-                
-                # 计算滚动IC
-                rolling_ic = self.calculate_rolling_ic(factor_values, forward_returns)
-                
-                # 计算IC统计
-                ic_stats = {
-                    'ic': ic,
-                    'ic_mean': rolling_ic.mean(),
-                    'ic_std': rolling_ic.std(),
-                    'ic_ir': self.calculate_ic_ir(factor_values, forward_returns),
-                    'ic_win_rate': (rolling_ic > 0).mean(),
-                    'ic_positive_rate': (rolling_ic > 0.02).mean(),
-                    'ic_negative_rate': (rolling_ic < -0.02).mean()
-                }
-                
-                results[f'period_{period}'] = ic_stats
+                aligned_data = pd.concat([factor_values, forward_returns], axis=1).dropna()
+                factor_arr, return_arr = self._to_arrays(aligned_data)
+                factor_arrs.append(factor_arr)
+                return_arrs.append(return_arr)
             
-            return results
+            period_stats = self._map(self._ic_stats_np, len(returns), factor_arrs, return_arrs)
+            
+            return {
+                f'period_{period}': ic_stats
+                for period, ic_stats in zip(periods, period_stats)
+            }
             
         except Exception as e:
             self.logger.error(f"计算IC统计失败: {e}")
             return {}
     
+    def _ic_stats_np(self, f: np.ndarray, r: np.ndarray, window: int = 30) -> Dict:
+        """在已对齐且无缺失值的数组上计算单期IC统计, 滚动IC只计算一次"""
+        rolling_ic = pd.Series(self._rolling_ic_np(f, r, window), dtype=float)
+        
+        return {
+            'ic': self._calculate_ic_np(f, r),
+            'ic_mean': rolling_ic.mean(),
+            'ic_std': rolling_ic.std(),
+            'ic_ir': self._ic_ir_from_rolling(rolling_ic),
+            'ic_win_rate': (rolling_ic > 0).mean(),
+            'ic_positive_rate': (rolling_ic > 0.02).mean(),
+            'ic_negative_rate': (rolling_ic < -0.02).mean()
+        }
+    
+    def _rolling_ic_summary_np(self, f: np.ndarray, r: np.ndarray, window: int) -> Dict:
+        """在已对齐且无缺失值的数组上计算滚动IC的汇总统计"""
+        rolling_ic = pd.Series(self._rolling_ic_np(f, r, window), dtype=float)
+        
+        return {
+            'mean': rolling_ic.mean(),
+            'std': rolling_ic.std(),
+            'min': rolling_ic.min(),
+            'max': rolling_ic.max(),
+            'positive_rate': (rolling_ic > 0).mean()
+        }
+    
     def calculate_ic_decay(
         self,
         factor_values: pd.Series,
@@ -209,19 +417,34 @@ class ICAnalyzer:
             IC衰减序列
         """
         try:
-            ic_decay = pd.Series(index=range(1, max_period + 1), dtype=float)
+            factor_arr = factor_values.reindex(returns.index).to_numpy(dtype=np.float64)
+            return_arr = returns.to_numpy(dtype=np.float64)
             
-            for period in range(1, max_period + 1):
-                forward_returns = returns.shift(-period)
-                ic = self.calculate_ic(factor_values, forward_returns)
-                ic_decay[period] = ic
-            
-            return ic_decay
+            return self._ic_decay_np(factor_arr, return_arr, max_period)
             
         except Exception as e:
             self.logger.error(f"计算IC衰减失败: {e}")
             return pd.Series(dtype=float)
     
+    @staticmethod
+    def _forward_returns_np(r: np.ndarray, periods: List[int]) -> np.ndarray:
+        """构造前瞻收益率矩阵 (N, P), 第j列为r向前平移periods[j]期, 尾部补NaN"""
+        forward = np.full((len(r), len(periods)), np.nan)
+        for j, period in enumerate(periods):
+            if period < len(r):
+                forward[:len(r) - period, j] = r[period:]
+        return forward
+    
+    def _ic_decay_np(self, f: np.ndarray, r: np.ndarray, max_period: int = 20) -> pd.Series:
+        """
+        在同一索引上对齐(可含缺失值)的数组上计算IC衰减
+        
+        一次性构造所有前瞻期的收益率矩阵, 按列计算IC
+        """
+        periods = range(1, max_period + 1)
+        forward = self._forward_returns_np(r, list(periods))
+        return pd.Series(self._masked_column_corr(f, forward), index=periods)
+    
     def rank_ic_analysis(
         self,
         factor_values: pd.Series,
@@ -245,51 +468,52 @@ class ICAnalyzer:
             if len(aligned_data) < quantiles * 2:
                 return {}
             
-            factor_col = aligned_data.iloc[:, 0]
-            return_col = aligned_data.iloc[:, 1]
-            
-            # 因子分层
-            factor_quantiles = pd.qcut(factor_col, q=quantiles, labels=False, duplicates='drop')
-            
-            # 计算各层收益率
-            quantile_returns = {}
-            for q in range(quantiles):
-                mask = factor_quantiles == q
-                if mask.any():
-                    quantile_returns[f'Q{q+1}'] = return_col[mask].mean()
-            
-            # 计算多空收益率
-            if len(quantile_returns) >= 2:
-                long_short_return = quantile_returns[f'Q{quantiles}'] - quantile_returns['Q1']
-            else:
-                long_short_return = np.nan
-            
-            return {
-                'quantile_returns': quantile_returns,
-                'long_short_return': long_short_return,
-                'monotonicity': self._check_monotonicity(list(quantile_returns.values()))
-            }
+            factor_arr, return_arr = self._to_arrays(aligned_data)
+            return self._rank_ic_np(factor_arr, return_arr, quantiles)
             
         except Exception as e:
             self.logger.error(f"分层IC分析失败: {e}")
             return {}
     
+    def _rank_ic_np(self, f: np.ndarray, r: np.ndarray, quantiles: int = 5) -> Dict:
+        """在已对齐且无缺失值的数组上做分层IC分析"""
+        if len(f) < quantiles * 2:
+            return {}
+        
+        # 因子分层
+        factor_quantiles = qcut_labels(f, quantiles)
+        
+        # 计算各层收益率 (bincount一次遍历得到各层和与计数)
+        counts = np.bincount(factor_quantiles, minlength=quantiles)
+        sums = np.bincount(factor_quantiles, weights=r, minlength=quantiles)
+        quantile_returns = {
+            f'Q{q+1}': sums[q] / counts[q]
+            for q in range(quantiles) if counts[q] > 0
+        }
+        
+        # 计算多空收益率
+        if len(quantile_returns) >= 2:
+            long_short_return = quantile_returns[f'Q{quantiles}'] - quantile_returns['Q1']
+        else:
+            long_short_return = np.nan
+        
+        return {
+            'quantile_returns': quantile_returns,
+            'long_short_return': long_short_return,
+            'monotonicity': self._check_monotonicity(list(quantile_returns.values()))
+        }
+    
     def _check_monotonicity(self, values: List[float]) -> float:
         """检查单调性"""
         if len(values) < 2:
             return np.nan
         
-        diffs = np.diff(values)
-        positive_diffs = np.sum(diffs > 0)
-        negative_diffs = np.sum(diffs < 0)
-        total_diffs = len(diffs)
-        
-        if total_diffs == 0:
+        diffs = np.diff(np.asarray(values, dtype=np.float64))
+        if diffs.size == 0:
             return 0.0
         
-        # 单调性得分
-        monotonicity = (positive_diffs - negative_diffs) / total_diffs
-        return monotonicity
+        # 单调性得分: 符号一次求和即为 (上升次数 - 下降次数), NaN差分不计入
+        return float(np.nansum(np.sign(diffs)) / diffs.size)
     
     def comprehensive_analysis(
         self,
@@ -309,29 +533,40 @@ class ICAnalyzer:
             综合分析结果
         """
         try:
-            # 计算收益率
+            # 计算收益率, 并将因子与收益率一次性对齐为数组
             returns = price_data['close'].pct_change()
+            factor_arr = factor_values.reindex(returns.index).to_numpy(dtype=np.float64)
+            return_arr = returns.to_numpy(dtype=np.float64)
+            
+            valid = ~np.isnan(factor_arr) & ~np.isnan(return_arr)
+            f_valid, r_valid = factor_arr[valid], return_arr[valid]
             
             results = {
                 'basic_ic_stats': {},
                 'rolling_ic_stats': {},
-                'ic_decay': self.calculate_ic_decay(factor_values, returns),
-                'rank_analysis': self.rank_ic_analysis(factor_values, returns)
+                'ic_decay': self._ic_decay_np(factor_arr, return_arr),
+                'rank_analysis': self._rank_ic_np(f_valid, r_valid)
             }
             
             # 基础IC统计
-            results['basic_ic_stats'] = self.calculate_ic_stats(factor_values, returns, periods)
+            forward = self._forward_returns_np(return_arr, periods)
+            factor_arrs, forward_arrs = [], []
+            for j in range(len(periods)):
+                period_valid = ~np.isnan(factor_arr) & ~np.isnan(forward[:, j])
+                factor_arrs.append(factor_arr[period_valid])
+                forward_arrs.append(forward[period_valid, j])
+            
+            period_stats = self._map(self._ic_stats_np, len(f_valid), factor_arrs, forward_arrs)
+            for period, ic_stats in zip(periods, period_stats):
+                results['basic_ic_stats'][f'period_{period}'] = ic_stats
             
             # 滚动IC统计
-            for window in [20, 60, 120]:
-                rolling_ic = self.calculate_rolling_ic(factor_values, returns, window)
-                results['rolling_ic_stats'][f'window_{window}'] = {
-                    'mean': rolling_ic.mean(),
-                    'std': rolling_ic.std(),
-                    'min': rolling_ic.min(),
-                    'max': rolling_ic.max(),
-                    'positive_rate': (rolling_ic > 0).mean()
-                }
+            windows = [20, 60, 120]
+            window_stats = self._map(
+                partial(self._rolling_ic_summary_np, f_valid, r_valid), len(f_valid), windows
+            )
+            for window, summary in zip(windows, window_stats):
+                results['rolling_ic_stats'][f'window_{window}'] = summary
             
             return results
             
@@ -5,8 +5,13 @@
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 from src.utils.logger import get_logger
+from ._performance_kernels import _max_dd_scan, _rolling_max_drawdown
+
+
+# 收益率输入: pandas序列或一维数组
+ReturnsLike = Union[pd.Series, np.ndarray]
 
 
 class PerformanceAnalyzer:
@@ -15,9 +20,46 @@ class PerformanceAnalyzer:
     def __init__(self):
         self.logger = get_logger("performance_analyzer")
     
+    @staticmethod
+    def _as_array(returns: ReturnsLike) -> np.ndarray:
+        """收益率统一转为连续的float64数组, 缺失值保留为NaN"""
+        if isinstance(returns, pd.Series):
+            returns = returns.to_numpy(dtype=np.float64, na_value=np.nan)
+        return np.ascontiguousarray(returns, dtype=np.float64)
+    
+    @staticmethod
+    def _dropna(values: np.ndarray) -> np.ndarray:
+        """去除NaN, 对应pandas统计量的skipna行为"""
+        missing = np.isnan(values)
+        return values[~missing] if missing.any() else values
+    
+    @staticmethod
+    def _mean_std(values: np.ndarray) -> Tuple[float, float]:
+        """无缺失数组的均值与样本标准差 (ddof=1), 样本不足时为NaN"""
+        n = values.size
+        if n == 0:
+            return np.nan, np.nan
+        mean = values.mean()
+        if n < 2:
+            return mean, np.nan
+        dev = values - mean
+        return mean, np.sqrt(np.dot(dev, dev) / (n - 1))
+    
     def calculate_returns(self, prices: pd.Series) -> pd.Series:
         """计算收益率"""
-        return prices.pct_change().fillna(0)
+        p = prices.to_numpy(dtype=np.float64, na_value=np.nan)
+        r = np.empty_like(p)
+        if len(p):
+            r[0] = 0.0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                np.divide(p[1:], p[:-1], out=r[1:])
+            r[1:] -= 1.0
+            
+            # 缺失价格对应的收益率记为0 (与pct_change().fillna(0)一致)
+            missing = np.isnan(r)
+            if missing.any():
+                r[missing] = 0.0
+        return pd.Series(r, index=prices.index, name=prices.name)
     
     def calculate_cumulative_returns(self, returns: pd.Series) -> pd.Series:
         """计算累计收益率"""
@@ -25,7 +67,7 @@ class PerformanceAnalyzer:
     
     def calculate_sharpe_ratio(
         self, 
-        returns: pd.Series, 
+        returns: ReturnsLike, 
         risk_free_rate: float = 0.02,
         periods_per_year: int = 252
     ) -> float:
@@ -41,11 +83,13 @@ class PerformanceAnalyzer:
             if len(returns) == 0:
                 return np.nan
             
+            mean, std = self._mean_std(self._dropna(self._as_array(returns)))
+            
             # 年化收益率
-            annual_return = returns.mean() * periods_per_year
+            annual_return = mean * periods_per_year
             
             # 年化波动率
-            annual_volatility = returns.std() * np.sqrt(periods_per_year)
+            annual_volatility = std * np.sqrt(periods_per_year)
             
             if annual_volatility == 0:
                 return np.nan
@@ -58,7 +102,7 @@ class PerformanceAnalyzer:
             self.logger.error(f"计算夏普比率失败: {e}")
             return np.nan
     
-    def calculate_max_drawdown(self, returns: pd.Series) -> Dict:
+    def calculate_max_drawdown(self, returns: ReturnsLike) -> Dict:
         """
         计算最大回撤
         
@@ -69,40 +113,18 @@ class PerformanceAnalyzer:
             if len(returns) == 0:
                 return {}
             
-            # 计算累计收益率
-            cumulative = self.calculate_cumulative_returns(returns)
-            
-            # 计算累计最高点
-            running_max = cumulative.expanding().max()
-            
-            # 计算回撤
-            drawdown = (cumulative - running_max) / (1 + running_max)
-            
-            # 最大回撤
-            max_drawdown = drawdown.min()
+            # 编译内核单次扫描: 净值/峰值/回撤均不落地为中间数组
+            drawdown_values = np.empty(len(returns))
+            max_drawdown, start, end, _ = _max_dd_scan(self._as_array(returns), drawdown_values)
+            index = returns.index if isinstance(returns, pd.Series) else pd.RangeIndex(len(returns))
+            drawdown = pd.Series(drawdown_values, index=index, copy=False)
             
             # 找到最大回撤的时间点
-            max_dd_end = drawdown.idxmin()
-            max_dd_start = cumulative.loc[:max_dd_end].idxmax()
+            max_dd_start = index[start] if start >= 0 else np.nan
+            max_dd_end = index[end] if end >= 0 else np.nan
             
             # 计算回撤持续时间
-            if pd.notna(max_dd_start) and pd.notna(max_dd_end):
-                try:
-                    if isinstance(max_dd_start, str):
-                        max_dd_start = pd.to_datetime(max_dd_start)
-                    if isinstance(max_dd_end, str):
-                        max_dd_end = pd.to_datetime(max_dd_end)
-                    
-                    # 如果索引是整数，则使用索引差值
-                    if isinstance(max_dd_start, (int, np.integer)) or isinstance(max_dd_end, (int, np.integer)):
-                        duration = int(max_dd_end) - int(max_dd_start)
-                    else:
-                        # 如果是datetime，计算天数差
-                        duration = (max_dd_end - max_dd_start).days
-                except:
-                    duration = 0
-            else:
-                duration = 0
+            duration = self._drawdown_duration(max_dd_start, max_dd_end)
             
             return {
                 'max_drawdown': max_drawdown,
@@ -116,16 +138,53 @@ class PerformanceAnalyzer:
             self.logger.error(f"计算最大回撤失败: {e}")
             return {}
     
-    def calculate_calmar_ratio(self, returns: pd.Series, periods_per_year: int = 252) -> float:
-        """计算卡玛比率"""
+    @staticmethod
+    def _drawdown_duration(max_dd_start, max_dd_end) -> int:
+        """由回撤起止索引标签计算回撤持续时间"""
+        if pd.notna(max_dd_start) and pd.notna(max_dd_end):
+            try:
+                if isinstance(max_dd_start, str):
+                    max_dd_start = pd.to_datetime(max_dd_start)
+                if isinstance(max_dd_end, str):
+                    max_dd_end = pd.to_datetime(max_dd_end)
+                
+                # 如果索引是整数，则使用索引差值
+                if isinstance(max_dd_start, (int, np.integer)) or isinstance(max_dd_end, (int, np.integer)):
+                    return int(max_dd_end) - int(max_dd_start)
+                # 如果是datetime，计算天数差
+                return (max_dd_end - max_dd_start).days
+            except:
+                return 0
+        return 0
+    
+    def calculate_calmar_ratio(
+        self, 
+        returns: ReturnsLike, 
+        periods_per_year: int = 252,
+        max_drawdown: Optional[float] = None
+    ) -> float:
+        """
+        计算卡玛比率
+        
+        Args:
+            returns: 收益率序列
+            periods_per_year: 年化周期数
+            max_drawdown: 已计算的最大回撤（可选，传入时不再重复扫描回撤）
+        """
         try:
-            annual_return = returns.mean() * periods_per_year
-            max_dd_info = self.calculate_max_drawdown(returns)
+            if len(returns) == 0:
+                return np.nan
+            
+            values = self._as_array(returns)
+            annual_return = self._mean_std(self._dropna(values))[0] * periods_per_year
+            if max_drawdown is None:
+                # 只需最大回撤标量, 直接调用扫描内核, 不构造回撤序列
+                max_drawdown = _max_dd_scan(values, np.empty(len(values)))[0]
             
-            if not max_dd_info or max_dd_info.get('max_drawdown', 0) == 0:
+            if np.isnan(max_drawdown) or max_drawdown == 0:
                 return np.nan
             
-            calmar = annual_return / abs(max_dd_info['max_drawdown'])
+            calmar = annual_return / abs(max_drawdown)
             return calmar
             
         except Exception as e:
@@ -134,17 +193,25 @@ class PerformanceAnalyzer:
     
     def calculate_sortino_ratio(
         self, 
-        returns: pd.Series, 
+        returns: ReturnsLike, 
         risk_free_rate: float = 0.02,
         periods_per_year: int = 252
     ) -> float:
         """计算索提诺比率"""
         try:
-            annual_return = returns.mean() * periods_per_year
-            
-            # 下行标准差
-            negative_returns = returns[returns < 0]
-            downside_std = negative_returns.std() * np.sqrt(periods_per_year)
+            values = self._as_array(returns)
+            annual_return = self._mean_std(self._dropna(values))[0] * periods_per_year
+            
+            # 下行标准差: 在掩码上直接累加一阶/二阶和, 不生成负收益子序列
+            negative = values < 0
+            n_neg = np.count_nonzero(negative)
+            if n_neg > 1:
+                neg_sum = np.sum(values, where=negative)
+                neg_sq_sum = np.sum(values * values, where=negative)
+                downside_var = max(neg_sq_sum - neg_sum * neg_sum / n_neg, 0.0) / (n_neg - 1)
+                downside_std = np.sqrt(downside_var) * np.sqrt(periods_per_year)
+            else:
+                downside_std = np.nan
             
             if downside_std == 0:
                 return np.nan
@@ -156,24 +223,20 @@ class PerformanceAnalyzer:
             self.logger.error(f"计算索提诺比率失败: {e}")
             return np.nan
     
-    def calculate_win_rate(self, returns: pd.Series) -> float:
+    def calculate_win_rate(self, returns: ReturnsLike) -> float:
         """计算胜率"""
-        try:
-            if len(returns) == 0:
-                return np.nan
-            
-            win_rate = (returns > 0).mean()
-            return win_rate
-            
-        except Exception as e:
-            self.logger.error(f"计算胜率失败: {e}")
+        if len(returns) == 0:
             return np.nan
+        
+        win_rate = np.count_nonzero(self._as_array(returns) > 0) / len(returns)
+        return win_rate
     
-    def calculate_profit_loss_ratio(self, returns: pd.Series) -> float:
+    def calculate_profit_loss_ratio(self, returns: ReturnsLike) -> float:
         """计算盈亏比"""
         try:
-            positive_returns = returns[returns > 0]
-            negative_returns = returns[returns < 0]
+            values = self._as_array(returns)
+            positive_returns = values[values > 0]
+            negative_returns = values[values < 0]
             
             if len(positive_returns) == 0 or len(negative_returns) == 0:
                 return np.nan
@@ -191,87 +254,130 @@ class PerformanceAnalyzer:
             self.logger.error(f"计算盈亏比失败: {e}")
             return np.nan
     
-    def calculate_volatility(self, returns: pd.Series, periods_per_year: int = 252) -> float:
+    def calculate_volatility(self, returns: ReturnsLike, periods_per_year: int = 252) -> float:
         """计算年化波动率"""
-        try:
-            if len(returns) == 0:
-                return np.nan
-            
-            volatility = returns.std() * np.sqrt(periods_per_year)
-            return volatility
-            
-        except Exception as e:
-            self.logger.error(f"计算波动率失败: {e}")
+        if len(returns) == 0:
+            return np.nan
+        
+        volatility = self._mean_std(self._dropna(self._as_array(returns)))[1] * np.sqrt(periods_per_year)
+        return volatility
+    
+    @staticmethod
+    def _central_moments(returns: ReturnsLike) -> Tuple[int, np.ndarray, float]:
+        """返回 (有效样本数, 离差数组, 离差平方和), 供偏度/峰度复用"""
+        values = PerformanceAnalyzer._dropna(PerformanceAnalyzer._as_array(returns))
+        n = values.size
+        dev = values - values.mean() if n else values
+        return n, dev, float(np.dot(dev, dev))
+    
+    @staticmethod
+    def _skewness_from_moments(n: int, m2: float, m3: float) -> float:
+        """由离差平方和/立方和计算偏度 (与pandas一致的偏差修正公式, 方差为0时取0)"""
+        if n < 3:
+            return np.nan
+        if m2 == 0:
+            return 0.0
+        return n * (n - 1) ** 0.5 / (n - 2) * m3 / m2 ** 1.5
+    
+    @staticmethod
+    def _kurtosis_from_moments(n: int, m2: float, m4: float) -> float:
+        """由离差平方和/四次方和计算超额峰度 (与pandas一致的偏差修正公式, 方差为0时取0)"""
+        if n < 4:
             return np.nan
+        if m2 == 0:
+            return 0.0
+        return (
+            n * (n + 1) * (n - 1) * m4 / ((n - 2) * (n - 3) * m2 ** 2)
+            - 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        )
     
-    def calculate_skewness(self, returns: pd.Series) -> float:
+    def calculate_skewness(self, returns: ReturnsLike) -> float:
         """计算偏度"""
-        try:
-            if len(returns) < 3:
-                return np.nan
-            
-            skewness = returns.skew()
-            return skewness
-            
-        except Exception as e:
-            self.logger.error(f"计算偏度失败: {e}")
+        if len(returns) < 3:
             return np.nan
+        
+        n, dev, m2 = self._central_moments(returns)
+        return self._skewness_from_moments(n, m2, float((dev * dev * dev).sum()))
     
-    def calculate_kurtosis(self, returns: pd.Series) -> float:
+    def calculate_kurtosis(self, returns: ReturnsLike) -> float:
         """计算峰度"""
-        try:
-            if len(returns) < 4:
-                return np.nan
-            
-            kurtosis = returns.kurtosis()
-            return kurtosis
-            
-        except Exception as e:
-            self.logger.error(f"计算峰度失败: {e}")
+        if len(returns) < 4:
             return np.nan
+        
+        n, dev, m2 = self._central_moments(returns)
+        dev2 = dev * dev
+        return self._kurtosis_from_moments(n, m2, float((dev2 * dev2).sum()))
+    
+    @staticmethod
+    def _var_cvar(values: np.ndarray, confidence_level: float) -> Tuple[float, float]:
+        """在去除NaN的一维数组上一次性计算VaR和CVaR"""
+        values = PerformanceAnalyzer._dropna(values)
+        if values.size == 0:
+            return np.nan, np.nan
+        
+        var = np.quantile(values, confidence_level)
+        cvar = values[values <= var].mean()
+        return var, cvar
     
-    def calculate_var(self, returns: pd.Series, confidence_level: float = 0.05) -> float:
+    def calculate_var(self, returns: ReturnsLike, confidence_level: float = 0.05) -> float:
         """计算风险价值 (VaR)"""
-        try:
-            if len(returns) == 0:
-                return np.nan
-            
-            var = returns.quantile(confidence_level)
-            return var
-            
-        except Exception as e:
-            self.logger.error(f"计算VaR失败: {e}")
+        if len(returns) == 0:
             return np.nan
+        
+        values = self._dropna(self._as_array(returns))
+        return np.quantile(values, confidence_level) if values.size else np.nan
     
-    def calculate_cvar(self, returns: pd.Series, confidence_level: float = 0.05) -> float:
+    def calculate_cvar(self, returns: ReturnsLike, confidence_level: float = 0.05) -> float:
         """计算条件风险价值 (CVaR)"""
+        return self.calculate_var_cvar(returns, confidence_level)[1]
+    
+    def calculate_var_cvar(self, returns: ReturnsLike, confidence_level: float = 0.05) -> Tuple[float, float]:
+        """
+        同时计算风险价值和条件风险价值
+        
+        Returns:
+            (VaR, CVaR)
+        """
         try:
             if len(returns) == 0:
-                return np.nan
+                return np.nan, np.nan
             
-            var = self.calculate_var(returns, confidence_level)
-            cvar = returns[returns <= var].mean()
-            return cvar
+            return self._var_cvar(self._as_array(returns), confidence_level)
             
         except Exception as e:
             self.logger.error(f"计算CVaR失败: {e}")
-            return np.nan
+            return np.nan, np.nan
+    
+    @staticmethod
+    def _align_pair(left: ReturnsLike, right: ReturnsLike) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        对齐两条收益率序列, 并用共同的NaN掩码剔除缺失值
+        
+        两者均为Series且索引不同时按左序列索引对齐, 否则按位置对齐
+        """
+        if isinstance(left, pd.Series) and isinstance(right, pd.Series) and not right.index.equals(left.index):
+            right = right.reindex(left.index)
+        a = PerformanceAnalyzer._as_array(left)
+        b = PerformanceAnalyzer._as_array(right)
+        mask = ~(np.isnan(a) | np.isnan(b))
+        return a[mask], b[mask]
     
     def calculate_information_ratio(
         self, 
-        strategy_returns: pd.Series, 
-        benchmark_returns: pd.Series
+        strategy_returns: ReturnsLike, 
+        benchmark_returns: ReturnsLike
     ) -> float:
         """计算信息比率"""
         try:
             # 超额收益
-            excess_returns = strategy_returns - benchmark_returns
+            strategy_aligned, benchmark_aligned = self._align_pair(strategy_returns, benchmark_returns)
+            excess_returns = strategy_aligned - benchmark_aligned
             
             if len(excess_returns) == 0:
                 return np.nan
             
             # 跟踪误差
-            tracking_error = excess_returns.std()
+            tracking_error = excess_returns.std(ddof=1) if len(excess_returns) > 1 else np.nan
             
             if tracking_error == 0:
                 return np.nan
@@ -286,27 +392,25 @@ class PerformanceAnalyzer:
     
     def calculate_beta(
         self, 
-        strategy_returns: pd.Series, 
-        market_returns: pd.Series
+        strategy_returns: ReturnsLike, 
+        market_returns: ReturnsLike
     ) -> float:
         """计算贝塔系数"""
         try:
             # 对齐数据
-            aligned_data = pd.concat([strategy_returns, market_returns], axis=1).dropna()
-            if len(aligned_data) < 2:
+            strategy_aligned, market_aligned = self._align_pair(strategy_returns, market_returns)
+            if len(strategy_aligned) < 2:
                 return np.nan
             
-            strategy_aligned = aligned_data.iloc[:, 0]
-            market_aligned = aligned_data.iloc[:, 1]
+            # 计算贝塔: 离差积和 / 市场离差平方和 (协方差与方差的自由度相互抵消)
+            strategy_dev = strategy_aligned - strategy_aligned.mean()
+            market_dev = market_aligned - market_aligned.mean()
+            market_ss = np.dot(market_dev, market_dev)
             
-            # 计算贝塔
-            covariance = np.cov(strategy_aligned, market_aligned)[0, 1]
-            market_variance = np.var(market_aligned)
-            
-            if market_variance == 0:
+            if market_ss == 0:
                 return np.nan
             
-            beta = covariance / market_variance
+            beta = np.dot(strategy_dev, market_dev) / market_ss
             return beta
             
         except Exception as e:
@@ -315,8 +419,8 @@ class PerformanceAnalyzer:
     
     def comprehensive_analysis(
         self, 
-        returns: pd.Series,
-        benchmark_returns: Optional[pd.Series] = None,
+        returns: ReturnsLike,
+        benchmark_returns: Optional[ReturnsLike] = None,
         risk_free_rate: float = 0.02,
         periods_per_year: int = 252
     ) -> Dict:
@@ -336,30 +440,56 @@ class PerformanceAnalyzer:
             if len(returns) == 0:
                 return {}
             
+            # 一次性转为ndarray, 所有指标共享同一组聚合量, 避免每个指标各自遍历收益率序列
+            values = self._as_array(returns)
+            valid_mask = ~np.isnan(values)
+            r = values[valid_mask]
+            n = r.size
+            if n == 0:
+                return {}
+            
+            # 一阶及中心矩
+            mean = r.sum() / n
+            dev = r - mean
+            dev2 = dev * dev
+            m2 = dev2.sum()
+            std = np.sqrt(m2 / (n - 1)) if n > 1 else np.nan
+            
+            # 回撤分析: 编译内核单次扫描, 同时得到期末净值
+            max_drawdown, start, end, final_equity = _max_dd_scan(r, np.empty(n))
+            index = returns.index if isinstance(returns, pd.Series) else pd.RangeIndex(len(returns))
+            valid_index = index[valid_mask]
+            duration = self._drawdown_duration(valid_index[start], valid_index[end])
+            
             # 基础统计
-            total_return = self.calculate_cumulative_returns(returns).iloc[-1]
-            annual_return = returns.mean() * periods_per_year
-            volatility = self.calculate_volatility(returns, periods_per_year)
+            total_return = final_equity - 1
+            annual_return = mean * periods_per_year
+            volatility = std * np.sqrt(periods_per_year)
+            
+            # 涨跌样本
+            pos_r = r[r > 0]
+            neg_r = r[r < 0]
             
             # 风险调整指标
-            sharpe = self.calculate_sharpe_ratio(returns, risk_free_rate, periods_per_year)
-            sortino = self.calculate_sortino_ratio(returns, risk_free_rate, periods_per_year)
-            calmar = self.calculate_calmar_ratio(returns, periods_per_year)
+            sharpe = (annual_return - risk_free_rate) / volatility if volatility != 0 else np.nan
+            downside_std = (neg_r.std(ddof=1) if neg_r.size > 1 else np.nan) * np.sqrt(periods_per_year)
+            sortino = (annual_return - risk_free_rate) / downside_std if downside_std != 0 else np.nan
             
-            # 回撤分析
-            drawdown_info = self.calculate_max_drawdown(returns)
+            calmar = annual_return / abs(max_drawdown) if max_drawdown != 0 else np.nan
             
-            # 分布特征
-            skewness = self.calculate_skewness(returns)
-            kurtosis = self.calculate_kurtosis(returns)
+            # 分布特征: 复用同一组离差
+            skewness = self._skewness_from_moments(n, m2, (dev2 * dev).sum())
+            kurtosis = self._kurtosis_from_moments(n, m2, (dev2 * dev2).sum())
             
             # 风险指标
-            var_5 = self.calculate_var(returns, 0.05)
-            cvar_5 = self.calculate_cvar(returns, 0.05)
+            var_5, cvar_5 = self._var_cvar(r, 0.05)
             
             # 胜率和盈亏比
-            win_rate = self.calculate_win_rate(returns)
-            pl_ratio = self.calculate_profit_loss_ratio(returns)
+            win_rate = pos_r.size / len(values)
+            pl_ratio = np.nan
+            if pos_r.size and neg_r.size:
+                avg_loss = abs(neg_r.mean())
+                pl_ratio = pos_r.mean() / avg_loss if avg_loss != 0 else np.nan
             
             results = {
                 'total_return': total_return,
@@ -368,8 +498,8 @@ class PerformanceAnalyzer:
                 'sharpe_ratio': sharpe,
                 'sortino_ratio': sortino,
                 'calmar_ratio': calmar,
-                'max_drawdown': drawdown_info.get('max_drawdown', np.nan),
-                'max_drawdown_duration': drawdown_info.get('max_drawdown_duration', np.nan),
+                'max_drawdown': max_drawdown,
+                'max_drawdown_duration': duration,
                 'win_rate': win_rate,
                 'profit_loss_ratio': pl_ratio,
                 'skewness': skewness,
@@ -420,19 +550,24 @@ class PerformanceAnalyzer:
             
             rolling_results = pd.DataFrame(index=returns.index)
             
+            # 滚动均值/标准差由pandas原生滚动算子计算, 不再逐窗口回调Python函数
+            # 口径与 calculate_sharpe_ratio / calculate_volatility 的默认参数一致
+            risk_free_rate, periods_per_year = 0.02, 252
+            rolling = returns.rolling(window)
+            rolling_std = rolling.std() if {'sharpe_ratio', 'volatility'} & set(metrics) else None
+            
             for metric in metrics:
                 if metric == 'sharpe_ratio':
-                    rolling_results[metric] = returns.rolling(window).apply(
-                        lambda x: self.calculate_sharpe_ratio(x), raw=False
+                    annual_vol = rolling_std * np.sqrt(periods_per_year)
+                    rolling_results[metric] = (
+                        (rolling.mean() * periods_per_year - risk_free_rate)
+                        / annual_vol.where(annual_vol != 0)
                     )
                 elif metric == 'volatility':
-                    rolling_results[metric] = returns.rolling(window).apply(
-                        lambda x: self.calculate_volatility(x), raw=False
-                    )
+                    rolling_results[metric] = rolling_std * np.sqrt(periods_per_year)
                 elif metric == 'max_drawdown':
-                    rolling_results[metric] = returns.rolling(window).apply(
-                        lambda x: self.calculate_max_drawdown(x).get('max_drawdown', np.nan), 
-                        raw=False
+                    rolling_results[metric] = _rolling_max_drawdown(
+                        returns.to_numpy(dtype=np.float64, na_value=np.nan), window
                     )
             
             return rolling_results
@@ -0,0 +1,125 @@
+"""
+因子表达式缓存
+同一份行情数据上各因子共享的中间结果 (收益率、对数价格、滚动统计量等)
+
+注册表对同一个DataFrame依次调用各因子的calculate, 不同因子常用到相同的基础表达式,
+按 (算子, 列, 参数) 缓存后每个表达式只计算一次。
+
+缓存只在显式开启的求值作用域 (scope) 内生效, 由 compute_all / evaluate_parallel 等批量计算
+入口开启, 退出作用域时整体清空; 作用域外 cached 直接计算, 不保留任何结果。
+作用域内以 id(data) 为键并持有数据的弱引用: 数据对象被回收时条目随回调清除,
+id被复用时弱引用校验失败。键不反映数据内容, 作用域内不能原地修改传入的数据。
+
+作用域按线程隔离; 缓存的Series由多个因子共享, 调用方只能读取, 不能原地修改。
+"""
+
+import threading
+import weakref
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional
+
+
+# 当前线程的作用域: id(data) -> (弱引用, {表达式键: 结果}); 作用域外为None
+_local = threading.local()
+
+
+@contextmanager
+def scope() -> Iterator[None]:
+    """
+    开启表达式缓存作用域, 退出时清空其中的全部结果
+
+    嵌套开启时沿用外层作用域, 由最外层负责清空
+    """
+    if getattr(_local, 'stores', None) is not None:
+        yield
+        return
+
+    _local.stores = {}
+    try:
+        yield
+    finally:
+        _local.stores = None
+
+
+def get_store(data: pd.DataFrame) -> Optional[Dict]:
+    """获取数据对象对应的表达式缓存字典, 不在作用域内时返回None"""
+    stores = getattr(_local, 'stores', None)
+    if stores is None:
+        return None
+
+    key = id(data)
+    entry = stores.get(key)
+    if entry is not None and entry[0]() is data:
+        return entry[1]
+
+    def _evict(ref, key=key):
+        current = stores.get(key)
+        if current is not None and current[0] is ref:
+            del stores[key]
+
+    store: Dict = {}
+    stores[key] = (weakref.ref(data, _evict), store)
+    return store
+
+
+def cached(data: pd.DataFrame, key: Hashable, compute: Callable[[], Any]) -> Any:
+    """
+    查询表达式缓存, 未命中时调用compute计算并写入; 不在作用域内时直接计算
+
+    Args:
+        data: 行情数据
+        key: 表达式键, 约定为 (算子, 列, 参数...) 元组
+        compute: 无参计算函数
+    """
+    store = get_store(data)
+    if store is None:
+        return compute()
+    if key not in store:
+        store[key] = compute()
+    return store[key]
+
+
+def clear():
+    """清空当前作用域内的全部表达式缓存"""
+    stores = getattr(_local, 'stores', None)
+    if stores is not None:
+        stores.clear()
+
+
+def pct_change(data: pd.DataFrame, column: str = 'close', periods: int = 1) -> pd.Series:
+    """列的periods期收益率"""
+    return cached(
+        data, ('pct_change', column, periods),
+        lambda: data[column].pct_change(periods=periods)
+    )
+
+
+def log_price(data: pd.DataFrame, column: str = 'close') -> pd.Series:
+    """列的自然对数, 对数收益率与价格比值的对数均可由其差分得到"""
+    return cached(data, ('log', column), lambda: np.log(data[column]))
+
+
+def rolling(data: pd.DataFrame, column: str, window: int, stat: str) -> pd.Series:
+    """
+    列的滚动统计量
+
+    Args:
+        data: 行情数据
+        column: 列名
+        window: 滚动窗口
+        stat: pandas Rolling 的统计方法名, 如 'mean' / 'std' / 'skew' / 'kurt'
+    """
+    return cached(
+        data, ('rolling', column, window, stat),
+        lambda: getattr(data[column].rolling(window=window), stat)()
+    )
+
+
+def returns_rolling(data: pd.DataFrame, window: int, stat: str, column: str = 'close') -> pd.Series:
+    """一期收益率的滚动统计量"""
+    return cached(
+        data, ('returns_rolling', column, window, stat),
+        lambda: getattr(pct_change(data, column).rolling(window=window), stat)()
+    )
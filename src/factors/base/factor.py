@@ -3,13 +3,21 @@
 定义统一的因子计算接口和规范
 """
 
+import importlib
+import os
+import threading
+import weakref
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional, Any, Union
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Any, Tuple, Union
 import pandas as pd
 import numpy as np
 from datetime import datetime
 from dataclasses import dataclass
 from src.utils.logger import get_logger
+from . import expr_cache
 
 
 @dataclass
@@ -27,14 +35,116 @@ class FactorMetadata:
     created_date: datetime = None  # 创建日期
 
 
+class _PreprocessCache:
+    """
+    预处理结果的LRU缓存, 由全部因子共享, 按缓存数据的总字节数限制容量
+    
+    以 (预处理方法, id(data)) 为键并持有输入数据的弱引用 (与 expr_cache 相同): 输入被回收时
+    条目随回调清除, id被复用时弱引用校验失败; 命中时再核对数据签名 (形状、列名和末行的哈希),
+    末行被修改或追加数据后不会命中旧结果。签名不覆盖中间行, 原地修改中间行后需调用 clear()。
+    
+    输入无需处理时只记录标记, 命中后直接返回输入本身, 不持有也不复制调用方的数据;
+    只有预处理产生的新对象计入容量, 超过容量时淘汰最久未使用的条目
+    """
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        # 键 -> (输入的弱引用, 数据签名, 预处理结果 (输入无需处理时为None), 结果字节数)
+        self._entries: "OrderedDict[tuple, Tuple[weakref.ref, tuple, Optional[pd.DataFrame], int]]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.RLock()
+    
+    @staticmethod
+    def _signature(data: pd.DataFrame) -> tuple:
+        """数据签名: 只哈希最后一行 (含索引), 代价与数据长度无关"""
+        last_row = pd.util.hash_pandas_object(data.iloc[-1:], index=True).to_numpy()
+        return (data.shape, tuple(data.columns), last_row.tobytes())
+    
+    def get(self, methods: tuple, data: pd.DataFrame) -> Optional[pd.DataFrame]:
+        """查询预处理结果, 未命中时返回None"""
+        key = (methods, id(data))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0]() is not data:
+                return None
+        
+        if entry[1] != self._signature(data):
+            return None
+        
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return data if entry[2] is None else entry[2]
+    
+    def put(self, methods: tuple, data: pd.DataFrame, processed_data: pd.DataFrame):
+        """写入预处理结果; processed_data 为输入本身时只记录标记"""
+        stored = None if processed_data is data else processed_data
+        nbytes = 0 if stored is None else int(stored.memory_usage(index=True).sum())
+        # 单个结果超过容量时不缓存
+        if nbytes > self.max_bytes:
+            return
+        
+        key = (methods, id(data))
+        
+        def _evict(ref, key=key):
+            with self._lock:
+                current = self._entries.get(key)
+                if current is not None and current[0] is ref:
+                    del self._entries[key]
+                    self._nbytes -= current[3]
+        
+        entry = (weakref.ref(data, _evict), self._signature(data), stored, nbytes)
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._nbytes -= previous[3]
+            self._entries[key] = entry
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted[3]
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+    
+    def _reset(self):
+        """fork出的子进程中丢弃继承的条目并重建锁 (fork时锁可能正被其他线程持有)"""
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()
+        self._nbytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
 class BaseFactor(ABC):
     """因子计算基类"""
     
+    # 预处理缓存容量 (字节), 全部因子合计
+    CACHE_MAX_BYTES = 256 * 1024 * 1024
+    
+    # calculate 仅由逐列的pandas运算构成时置为True: 传入列为 (字段, 标的) 的宽表,
+    # data['close'] 取到的是 时间×标的 面板, 全部标的在一次滚动运算中完成
+    PANEL_VECTORIZED = False
+    
     def __init__(self, metadata: FactorMetadata):
         self.metadata = metadata
         self.logger = get_logger(f"factor.{metadata.name}")
         self.cache = {}  # 简单缓存
         
+    def __getstate__(self):
+        # 日志器持有文件句柄无法序列化, 缓存无需跨进程传递; 子进程中重新获取
+        state = self.__dict__.copy()
+        state.pop('logger', None)
+        state['cache'] = {}
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.logger = get_logger(f"factor.{self.metadata.name}")
+    
     @property
     def name(self) -> str:
         """因子名称"""
@@ -50,6 +160,8 @@ class BaseFactor(ABC):
         """
         计算因子值
         
+        输入数据可能是调用方的对象或多个因子共享的预处理缓存, 实现中不能原地修改data
+        
         Args:
             data: 输入数据，包含OHLCV等
             **kwargs: 其他参数
@@ -59,6 +171,32 @@ class BaseFactor(ABC):
         """
         pass
     
+    def calculate_panel(self, panel: Dict[str, pd.DataFrame], **kwargs) -> pd.DataFrame:
+        """
+        面板数据因子计算
+        
+        Args:
+            panel: 字段名 -> 面板 (行: 时间, 列: 标的), 需包含 data_requirements 中的全部字段,
+                各面板的索引和列一致
+            **kwargs: 其他参数
+            
+        Returns:
+            因子值面板 (行: 时间, 列: 标的)
+        """
+        fields = {name: panel[name] for name in self.metadata.data_requirements}
+        first = next(iter(fields.values()))
+        
+        if self.PANEL_VECTORIZED:
+            wide = pd.concat(fields, axis=1)
+            return self.calculate(wide, **kwargs).reindex(columns=first.columns)
+        
+        # 逐标的计算
+        columns = {}
+        for symbol in first.columns:
+            data = pd.DataFrame({name: frame[symbol] for name, frame in fields.items()})
+            columns[symbol] = self.calculate(data, **kwargs)
+        return pd.DataFrame(columns, index=first.index, columns=first.columns)
+    
     def validate_data(self, data: pd.DataFrame) -> bool:
         """
         验证输入数据
@@ -98,8 +236,9 @@ class BaseFactor(ABC):
         Returns:
             预处理后的数据
         """
-        # 复制数据避免修改原始数据
-        processed_data = data.copy()
+        # 不预先复制: 排序和缺失值填充都会返回新对象, 只有异常值替换是原地写入,
+        # 数据干净时直接返回原对象, 省去一次整表拷贝
+        processed_data = data
         
         # 排序
         if not processed_data.index.is_monotonic_increasing:
@@ -108,34 +247,85 @@ class BaseFactor(ABC):
         # 处理缺失值
         processed_data = self._handle_missing_values(processed_data)
         
-        # 异常值处理
-        processed_data = self._handle_outliers(processed_data)
+        # 异常值处理 (仍是原始数据时, 写入前先复制, 避免修改原始数据)
+        processed_data = self._handle_outliers(processed_data, copy=processed_data is data)
+        
+        return processed_data
+    
+    def _preprocess_cached(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        带LRU缓存的数据预处理
+        
+        缓存由全部因子共享: 预处理方法相同的因子在同一份数据上得到同一个预处理结果;
+        数据无需处理时返回输入本身。返回的数据由多个因子共享, calculate 不能原地修改
+        """
+        cls = type(self)
+        methods = (cls.preprocess_data, cls._handle_missing_values, cls._handle_outliers)
+        processed_data = _PREPROCESS_CACHE.get(methods, data)
+        if processed_data is not None:
+            return processed_data
         
+        processed_data = self.preprocess_data(data)
+        _PREPROCESS_CACHE.put(methods, data, processed_data)
         return processed_data
     
     def _handle_missing_values(self, data: pd.DataFrame) -> pd.DataFrame:
         """处理缺失值"""
+        # 无缺失值时直接返回, 不产生任何拷贝
+        if not data.isna().to_numpy().any():
+            return data
+        
         # 前向填充
-        data = data.fillna(method='ffill')
+        data = data.ffill()
         
         # 如果仍有缺失值，使用后向填充
-        data = data.fillna(method='bfill')
+        if data.isna().to_numpy().any():
+            data = data.bfill()
         
         return data
     
-    def _handle_outliers(self, data: pd.DataFrame, threshold: float = 3.0) -> pd.DataFrame:
-        """处理异常值（使用Z-score方法）"""
+    def _handle_outliers(
+        self, 
+        data: pd.DataFrame, 
+        threshold: float = 3.0,
+        copy: bool = False
+    ) -> pd.DataFrame:
+        """
+        处理异常值（使用Z-score方法）
+        
+        Args:
+            data: 输入数据
+            threshold: Z-score阈值
+            copy: 存在异常值时是否在副本上替换 (为False时原地修改data)
+        """
         numeric_cols = data.select_dtypes(include=[np.number]).columns
+        if len(numeric_cols) == 0:
+            return data
+        
+        # 所有数值列一次性计算Z-score, 代替逐列布尔掩码赋值
+        # 异常值判定只需比较阈值, 扫描在float32上进行 (均值/标准差以float64累加), 内存带宽减半
+        scan = data[numeric_cols].to_numpy(dtype=np.float32, na_value=np.nan)
+        with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+            mean = np.nanmean(scan, axis=0, dtype=np.float64).astype(np.float32)
+            std = np.nanstd(scan, axis=0, ddof=1, dtype=np.float64).astype(np.float32)
+            z_scores = np.abs((scan - mean) / std)
+        outliers = z_scores > threshold
         
-        for col in numeric_cols:
-            if col in data.columns:
-                z_scores = np.abs((data[col] - data[col].mean()) / data[col].std())
-                outliers = z_scores > threshold
-                
-                if outliers.any():
-                    # 使用中位数替换异常值
-                    data.loc[outliers, col] = data[col].median()
-                    self.logger.debug(f"处理了 {outliers.sum()} 个异常值在列 {col}")
+        outlier_counts = outliers.sum(axis=0)
+        if not outlier_counts.any():
+            return data
+        
+        # 使用中位数替换异常值, 只在原精度上写回存在异常值的列
+        affected = np.flatnonzero(outlier_counts)
+        cols = numeric_cols[affected]
+        values = data[cols].to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            median = np.nanmedian(values, axis=0)
+        if copy:
+            data = data.copy()
+        data[cols] = np.where(outliers[:, affected], median, values)
+        for col, count in zip(cols, outlier_counts[affected]):
+            self.logger.debug(f"处理了 {count} 个异常值在列 {col}")
         
         return data
     
@@ -155,8 +345,8 @@ class BaseFactor(ABC):
             if not self.validate_data(data):
                 return pd.Series(dtype=float)
             
-            # 预处理数据
-            processed_data = self.preprocess_data(data)
+            # 预处理数据 (同一份数据重复计算时命中缓存)
+            processed_data = self._preprocess_cached(data)
             
             # 计算因子
             factor_values = self.calculate(processed_data, **kwargs)
@@ -223,6 +413,12 @@ class BaseFactor(ABC):
         return f"Factor(name='{self.metadata.name}', category='{self.metadata.category}')"
 
 
+# 全部因子共享的预处理缓存
+_PREPROCESS_CACHE = _PreprocessCache(BaseFactor.CACHE_MAX_BYTES)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_PREPROCESS_CACHE._reset)
+
+
 class TechnicalFactor(BaseFactor):
     """技术因子基类"""
     
@@ -247,9 +443,52 @@ class AlternativeFactor(BaseFactor):
         super().__init__(metadata)
 
 
+def _compute_factor(factor: BaseFactor, data: pd.DataFrame) -> pd.Series:
+    """进程池任务: 计算单个因子"""
+    return factor.calculate_with_validation(data)
+
+
+def _compute_factor_shared(
+    factor: BaseFactor,
+    shm_name: str,
+    shape: tuple,
+    index: pd.Index,
+    columns: pd.Index
+) -> pd.Series:
+    """进程池任务: 以零拷贝方式挂载共享内存中的输入数据并计算单个因子"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        values = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        data = pd.DataFrame(values, index=index, columns=columns, copy=False)
+        
+        # 结果和缓存可能引用共享内存, 释放前先复制结果并清空缓存
+        result = factor.calculate_with_validation(data).copy()
+        _PREPROCESS_CACHE.clear()
+        del data, values
+        return result
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # 仍有视图引用共享内存时, 映射随子进程退出释放
+            pass
+
+
+def _compute_factors(factors: List[BaseFactor], data: pd.DataFrame) -> Dict[str, pd.Series]:
+    """进程池任务: 在同一份数据上依次计算一组因子 (在同一个表达式缓存作用域内共享中间结果)"""
+    with expr_cache.scope():
+        return {factor.name: factor.calculate_with_validation(data) for factor in factors}
+
+
 class FactorRegistry:
     """因子注册表"""
     
+    # 输入数据单元数×因子数低于该值时顺序计算 (进程启动开销大于计算本身)
+    PARALLEL_MIN_SIZE = 500_000
+    
+    # autodiscover 加载的内置因子模块, 各模块提供 register_<模块名>_factors 函数
+    AUTODISCOVER_MODULES = ("momentum", "volatility", "reversal")
+    
     def __init__(self):
         self._factors = {}
         self.logger = get_logger("factor_registry")
@@ -259,6 +498,23 @@ class FactorRegistry:
         self._factors[factor.name] = factor
         self.logger.info(f"注册因子: {factor.name}")
     
+    def register_many(self, factors: Iterable[BaseFactor]):
+        """批量注册因子, 只输出一条汇总日志"""
+        batch = {factor.name: factor for factor in factors}
+        self._factors.update(batch)
+        self.logger.info(f"批量注册因子 {len(batch)} 个: {', '.join(batch)}")
+    
+    def autodiscover(self):
+        """
+        导入内置技术因子模块并注册其全部因子
+
+        关闭自动注册 (FACTOR_AUTOREGISTER=false) 时, 模块导入不再产生注册副作用,
+        需要完整注册表的调用方显式调用本方法; 重复调用按因子名覆盖, 不会重复注册
+        """
+        for module_name in self.AUTODISCOVER_MODULES:
+            module = importlib.import_module(f"src.factors.technical.{module_name}")
+            getattr(module, f"register_{module_name}_factors")()
+    
     def get_factor(self, name: str) -> Optional[BaseFactor]:
         """获取因子"""
         return self._factors.get(name)
@@ -274,6 +530,96 @@ class FactorRegistry:
         """按分类获取因子"""
         return {name: factor for name, factor in self._factors.items() 
                 if factor.category == category}
+    
+    def compute_all(
+        self, 
+        data: pd.DataFrame, 
+        n_workers: Optional[int] = None
+    ) -> Dict[str, pd.Series]:
+        """
+        计算所有已注册因子
+        
+        各因子相互独立, 数据量较大时通过进程池并行计算; 输入全部为float64列时
+        经共享内存传给子进程, 避免每个任务各自序列化整张数据表
+        
+        Args:
+            data: 输入数据，包含OHLCV等
+            n_workers: 进程数（默认使用全部CPU核心）
+            
+        Returns:
+            因子名称到因子值序列的字典
+        """
+        factors = list(self._factors.values())
+        if not factors:
+            return {}
+        
+        n_workers = n_workers or os.cpu_count() or 1
+        if n_workers == 1 or len(factors) == 1 or data.size * len(factors) < self.PARALLEL_MIN_SIZE:
+            return _compute_factors(factors, data)
+        
+        n_workers = min(n_workers, len(factors))
+        
+        # 非纯float64数据无法零拷贝共享, 退回逐任务序列化
+        if not (data.dtypes == np.float64).all():
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = executor.map(_compute_factor, factors, [data] * len(factors))
+                return {factor.name: result for factor, result in zip(factors, results)}
+        
+        values = data.to_numpy(dtype=np.float64)
+        shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        try:
+            np.ndarray(values.shape, dtype=np.float64, buffer=shm.buf)[:] = values
+            n = len(factors)
+            with ProcessPoolExecutor(max_workers=n_workers) as executor:
+                results = executor.map(
+                    _compute_factor_shared,
+                    factors,
+                    [shm.name] * n,
+                    [values.shape] * n,
+                    [data.index] * n,
+                    [data.columns] * n
+                )
+                return {factor.name: result for factor, result in zip(factors, results)}
+        finally:
+            shm.close()
+            shm.unlink()
+
+    
+    def evaluate_parallel(
+        self,
+        data_by_symbol: Dict[str, pd.DataFrame],
+        n_workers: Optional[int] = None
+    ) -> Dict[str, Dict[str, pd.Series]]:
+        """
+        多标的计算所有已注册因子, 按标的分配到进程池
+        
+        每个任务在一个标的上计算全部因子, 同一标的内的中间结果可复用;
+        总数据量较小时顺序计算
+        
+        Args:
+            data_by_symbol: 标的 -> 输入数据
+            n_workers: 进程数（默认使用全部CPU核心）
+            
+        Returns:
+            标的 -> {因子名称: 因子值序列}
+        """
+        factors = list(self._factors.values())
+        if not factors or not data_by_symbol:
+            return {symbol: {} for symbol in data_by_symbol}
+        
+        symbols = list(data_by_symbol)
+        total_size = sum(data.size for data in data_by_symbol.values())
+        n_workers = min(n_workers or os.cpu_count() or 1, len(symbols))
+        if n_workers == 1 or total_size * len(factors) < self.PARALLEL_MIN_SIZE:
+            return {symbol: _compute_factors(factors, data_by_symbol[symbol]) for symbol in symbols}
+        
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            results = executor.map(
+                _compute_factors,
+                [factors] * len(symbols),
+                [data_by_symbol[symbol] for symbol in symbols]
+            )
+            return dict(zip(symbols, results))
 
 
 # 全局因子注册表
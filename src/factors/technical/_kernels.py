@@ -0,0 +1,396 @@
+"""
+技术因子计算内核
+逐元素递推的因子 (GARCH等) 由numba编译为机器码;
+*_panel 版本按标的 (列) 以prange并行, 输入为 时间×标的 的二维数组
+"""
+
+import numpy as np
+from src.utils.jit import njit, prange
+
+
+@njit(cache=True, nogil=True)
+def _garch_variance(returns, window, alpha, beta):
+    """
+    简化GARCH(1,1)条件方差
+
+    前window期取前window个收益率的样本方差; 此后
+    var[i] = (1-alpha-beta) * var(returns[:i]) + alpha * returns[i-1]^2 + beta * var[i-1],
+    其中无条件方差var(returns[:i])以Welford算法逐步累加, 每步O(1)
+
+    Args:
+        returns: 收益率数组 (float64)
+        window: 初始方差窗口
+        alpha: ARCH项系数
+        beta: GARCH项系数
+
+    Returns:
+        与输入等长的方差数组 (样本不足时为NaN)
+    """
+    n = returns.shape[0]
+    out = np.empty(n)
+
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+
+    m = min(window, n)
+    for i in range(m):
+        count += 1
+        delta = returns[i] - mean
+        mean += delta / count
+        m2 += delta * (returns[i] - mean)
+
+    initial_var = m2 / (count - 1) if count > 1 else np.nan
+    for i in range(m):
+        out[i] = initial_var
+
+    omega = 1.0 - alpha - beta
+    for i in range(window, n):
+        # 无条件方差覆盖 returns[:i]
+        while count < i:
+            x = returns[count]
+            count += 1
+            delta = x - mean
+            mean += delta / count
+            m2 += delta * (x - mean)
+        uncond_var = m2 / (count - 1) if count > 1 else np.nan
+
+        prev = returns[i - 1]
+        out[i] = omega * uncond_var + alpha * prev * prev + beta * out[i - 1]
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_mean_abs_dev(values, window):
+    """
+    滚动平均绝对偏差 mean(|x - mean(x)|)
+
+    窗口内含NaN或样本不足时结果为NaN, 与 rolling(window).apply 的行为一致
+
+    Args:
+        values: 输入数组 (float64)
+        window: 窗口长度
+
+    Returns:
+        与输入等长的数组
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+
+    for end in range(window - 1, n):
+        start = end - window + 1
+        total = 0.0
+        for i in range(start, end + 1):
+            total += values[i]
+        mean = total / window
+        if np.isnan(mean):
+            continue
+
+        dev = 0.0
+        for i in range(start, end + 1):
+            dev += abs(values[i] - mean)
+        out[end] = dev / window
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_rsi(close, window):
+    """
+    简单移动平均口径的RSI, 单次遍历完成涨跌拆分、滚动求和与RSI计算
+
+    涨跌幅为NaN时按0处理, 与 delta.where(delta > 0, 0) 的口径一致;
+    窗口内没有上涨 (下跌) 时对应的和精确置0, 避免增量求和的舍入残差
+
+    Args:
+        close: 收盘价数组 (float64)
+        window: 窗口长度
+
+    Returns:
+        与输入等长的RSI数组, 前 window-1 期为NaN
+    """
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    gains = np.zeros(n)
+    losses = np.zeros(n)
+
+    for i in range(1, n):
+        delta = close[i] - close[i - 1]
+        if delta > 0:
+            gains[i] = delta
+        elif delta < 0:
+            losses[i] = -delta
+
+    gain_sum = 0.0
+    loss_sum = 0.0
+    gain_count = 0
+    loss_count = 0
+
+    for i in range(n):
+        gain_sum += gains[i]
+        loss_sum += losses[i]
+        gain_count += gains[i] > 0
+        loss_count += losses[i] > 0
+
+        if i >= window:
+            gain_sum -= gains[i - window]
+            loss_sum -= losses[i - window]
+            gain_count -= gains[i - window] > 0
+            loss_count -= losses[i - window] > 0
+
+        if gain_count == 0:
+            gain_sum = 0.0
+        if loss_count == 0:
+            loss_sum = 0.0
+
+        if i < window - 1:
+            continue
+
+        if loss_sum == 0.0:
+            # 无下跌: 有上涨时RSI为100, 完全无波动时无定义
+            if gain_sum > 0.0:
+                out[i] = 100.0
+        else:
+            out[i] = 100.0 - 100.0 / (1.0 + gain_sum / loss_sum)
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _ewm_update(weighted, old_wt, value, decay):
+    """
+    单步指数加权均值更新, 与 pandas ewm(adjust=True, ignore_na=False).mean() 的递推一致
+
+    Returns:
+        (新的加权均值, 新的历史权重)
+    """
+    is_obs = value == value
+    if weighted == weighted:
+        old_wt *= decay
+        if is_obs:
+            if weighted != value:
+                weighted = (old_wt * weighted + value) / (old_wt + 1.0)
+            old_wt += 1.0
+    elif is_obs:
+        weighted = value
+    return weighted, old_wt
+
+
+@njit(cache=True, nogil=True)
+def _macd_histogram(close, fast, slow, signal):
+    """
+    MACD柱状图, 快线/慢线/信号线三条EMA在一次遍历中同步递推
+
+    Args:
+        close: 收盘价数组 (float64)
+        fast: 快线跨度
+        slow: 慢线跨度
+        signal: 信号线跨度
+
+    Returns:
+        MACD线与信号线之差, 与输入等长
+    """
+    n = close.shape[0]
+    out = np.full(n, np.nan)
+    if n == 0:
+        return out
+
+    decay_fast = 1.0 - 2.0 / (fast + 1.0)
+    decay_slow = 1.0 - 2.0 / (slow + 1.0)
+    decay_signal = 1.0 - 2.0 / (signal + 1.0)
+
+    ema_fast = close[0]
+    ema_slow = close[0]
+    macd = ema_fast - ema_slow
+    ema_signal = macd
+    wt_fast = 1.0
+    wt_slow = 1.0
+    wt_signal = 1.0
+    out[0] = macd - ema_signal
+
+    for i in range(1, n):
+        ema_fast, wt_fast = _ewm_update(ema_fast, wt_fast, close[i], decay_fast)
+        ema_slow, wt_slow = _ewm_update(ema_slow, wt_slow, close[i], decay_slow)
+        macd = ema_fast - ema_slow
+        ema_signal, wt_signal = _ewm_update(ema_signal, wt_signal, macd, decay_signal)
+        out[i] = macd - ema_signal
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_sum(values, window):
+    """
+    滚动求和 (min_periods=window), 窗口内含NaN时结果为NaN
+
+    有限值以Kahan补偿求和增量更新; ±inf单独计数, 移出窗口后不会残留为NaN
+
+    Args:
+        values: 输入数组 (float64)
+        window: 窗口长度
+
+    Returns:
+        与输入等长的数组
+    """
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+
+    total = 0.0
+    compensation = 0.0
+    nan_count = 0
+    pos_inf = 0
+    neg_inf = 0
+
+    for i in range(n):
+        for step in range(2):
+            # step 0: 新值进入窗口; step 1: 最早的值移出窗口
+            if step == 0:
+                value = values[i]
+                sign = 1
+            elif i >= window:
+                value = values[i - window]
+                sign = -1
+            else:
+                break
+
+            if np.isnan(value):
+                nan_count += sign
+            elif value == np.inf:
+                pos_inf += sign
+            elif value == -np.inf:
+                neg_inf += sign
+            else:
+                y = sign * value - compensation
+                t = total + y
+                compensation = (t - total) - y
+                total = t
+
+        if i < window - 1 or nan_count > 0:
+            continue
+        if pos_inf > 0 and neg_inf > 0:
+            continue
+        if pos_inf > 0:
+            out[i] = np.inf
+        elif neg_inf > 0:
+            out[i] = -np.inf
+        else:
+            out[i] = total
+
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _rolling_mean(values, window):
+    """滚动均值 (min_periods=window), 窗口内含NaN时结果为NaN"""
+    return _rolling_sum(values, window) / window
+
+
+@njit(cache=True, nogil=True)
+def _rolling_skew_kurt(values, window):
+    """
+    滚动偏度与峰度 (样本修正口径, 与 pandas rolling().skew() / .kurt() 一致), 一次遍历同时得到
+
+    每个窗口以两遍法计算二、三、四阶中心矩, 避免增量更新高阶矩时的舍入误差累积;
+    窗口内含NaN时为NaN, 窗口内数值完全相同时偏度取0、峰度取-3
+
+    Args:
+        values: 输入数组 (float64)
+        window: 窗口长度
+
+    Returns:
+        (偏度数组, 峰度数组), 与输入等长
+    """
+    n = values.shape[0]
+    skew = np.full(n, np.nan)
+    kurt = np.full(n, np.nan)
+    count = float(window)
+
+    for end in range(window - 1, n):
+        start = end - window + 1
+        total = 0.0
+        for i in range(start, end + 1):
+            total += values[i]
+        mean = total / count
+        if np.isnan(mean):
+            continue
+
+        m2 = 0.0
+        m3 = 0.0
+        m4 = 0.0
+        constant = True
+        for i in range(start, end + 1):
+            dev = values[i] - mean
+            dev2 = dev * dev
+            m2 += dev2
+            m3 += dev2 * dev
+            m4 += dev2 * dev2
+            if values[i] != values[start]:
+                constant = False
+        m2 /= count
+        m3 /= count
+        m4 /= count
+
+        if constant:
+            if window >= 3:
+                skew[end] = 0.0
+            if window >= 4:
+                kurt[end] = -3.0
+            continue
+        if m2 <= 1e-14:
+            continue
+
+        if window >= 3:
+            skew[end] = np.sqrt(count * (count - 1.0)) * m3 / ((count - 2.0) * m2 * np.sqrt(m2))
+        if window >= 4:
+            k = (count * count - 1.0) * m4 / (m2 * m2) - 3.0 * (count - 1.0) ** 2
+            kurt[end] = k / ((count - 2.0) * (count - 3.0))
+
+    return skew, kurt
+
+
+@njit(cache=True, nogil=True)
+def _garman_klass_volatility(high, low, close, window):
+    """
+    Garman-Klass已实现波动率 (年化)
+
+    逐期以对数价格计算 ln(H/L)*ln(H/C) + ln(L/C)^2, 滚动求和后年化开方
+
+    Args:
+        high: 最高价数组 (float64)
+        low: 最低价数组 (float64)
+        close: 收盘价数组 (float64)
+        window: 窗口长度
+
+    Returns:
+        与输入等长的数组, 前 window-1 期为NaN
+    """
+    n = close.shape[0]
+    contributions = np.empty(n)
+    for i in range(n):
+        log_high = np.log(high[i])
+        log_low = np.log(low[i])
+        log_close = np.log(close[i])
+        contributions[i] = (log_high - log_low) * (log_high - log_close) + (log_low - log_close) ** 2
+
+    return np.sqrt(_rolling_sum(contributions, window) * 252)
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _garch_variance_panel(returns, window, alpha, beta):
+    """_garch_variance 的面板版本, 各标的并行递推"""
+    n_periods, n_symbols = returns.shape
+    out = np.empty((n_periods, n_symbols))
+    for j in prange(n_symbols):
+        out[:, j] = _garch_variance(np.ascontiguousarray(returns[:, j]), window, alpha, beta)
+    return out
+
+
+@njit(cache=True, nogil=True, parallel=True)
+def _macd_histogram_panel(close, fast, slow, signal):
+    """_macd_histogram 的面板版本, 各标的并行递推"""
+    n_periods, n_symbols = close.shape
+    out = np.empty((n_periods, n_symbols))
+    for j in prange(n_symbols):
+        out[:, j] = _macd_histogram(np.ascontiguousarray(close[:, j]), fast, slow, signal)
+    return out
@@ -6,12 +6,30 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from src.config.settings import get_settings
 from ..base.factor import TechnicalFactor, FactorMetadata, factor_registry
+from ..base import expr_cache
+
+# 编译内核 (._kernels) 依赖numba, 在用到的方法内按需导入: 仅导入本模块或只计算纯pandas因子时不加载numba
+
+
+def rolling_rsi(data: pd.DataFrame, window: int) -> pd.Series:
+    """收盘价的简单移动平均口径RSI (表达式缓存, 动量与反转类RSI因子共享)"""
+    from ._kernels import _rolling_rsi
+    return expr_cache.cached(
+        data, ('rsi', 'close', window),
+        lambda: pd.Series(
+            _rolling_rsi(data['close'].to_numpy(dtype=np.float64), window),
+            index=data.index
+        )
+    )
 
 
 class MomentumFactor(TechnicalFactor):
     """动量因子 - 价格动量"""
     
+    PANEL_VECTORIZED = True
+    
     def __init__(self, window: int = 20):
         metadata = FactorMetadata(
             name=f"momentum_{window}",
@@ -28,10 +46,8 @@ class MomentumFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算动量因子"""
-        close = data['close']
-        
         # 计算收益率
-        returns = close.pct_change(periods=self.window)
+        returns = expr_cache.pct_change(data, 'close', self.window)
         
         return returns.fillna(0)
 
@@ -55,22 +71,8 @@ class RSIMomentumFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算RSI动量因子"""
-        close = data['close']
-        
-        # 计算价格变化
-        delta = close.diff()
-        
-        # 分离上涨和下跌
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        # 计算平均增益和损失
-        avg_gain = gain.rolling(window=self.window).mean()
-        avg_loss = loss.rolling(window=self.window).mean()
-        
         # 计算RSI
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi = rolling_rsi(data, self.window)
         
         # RSI动量：当前RSI与前一期RSI的差值
         rsi_momentum = rsi.diff()
@@ -99,22 +101,27 @@ class MACDMomentumFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算MACD动量因子"""
+        from ._kernels import _macd_histogram
         close = data['close']
         
-        # 计算EMA
-        ema_fast = close.ewm(span=self.fast).mean()
-        ema_slow = close.ewm(span=self.slow).mean()
-        
-        # 计算MACD线
-        macd_line = ema_fast - ema_slow
-        
-        # 计算信号线
-        signal_line = macd_line.ewm(span=self.signal).mean()
-        
-        # MACD柱状图（动量）
-        macd_histogram = macd_line - signal_line
+        # MACD柱状图（动量）: 快线、慢线与信号线EMA在编译内核中单次遍历递推
+        macd_histogram = pd.Series(
+            _macd_histogram(close.to_numpy(dtype=np.float64), self.fast, self.slow, self.signal),
+            index=close.index
+        )
         
         return macd_histogram.fillna(0)
+    
+    def calculate_panel(self, panel, **kwargs) -> pd.DataFrame:
+        """计算MACD动量因子面板 (各标的在编译内核中并行递推)"""
+        from ._kernels import _macd_histogram_panel
+        close = panel['close']
+        macd_histogram = pd.DataFrame(
+            _macd_histogram_panel(close.to_numpy(dtype=np.float64), self.fast, self.slow, self.signal),
+            index=close.index,
+            columns=close.columns
+        )
+        return macd_histogram.fillna(0)
 
 
 class VolumeMomentumFactor(TechnicalFactor):
@@ -136,15 +143,18 @@ class VolumeMomentumFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算成交量动量因子"""
+        from ._kernels import _rolling_mean
         volume = data['volume']
+        values = volume.to_numpy(dtype=np.float64)
         
         # 计算成交量移动平均
-        volume_ma = volume.rolling(window=self.window).mean()
+        volume_ma = _rolling_mean(values, self.window)
         
         # 成交量相对强度
-        volume_momentum = volume / volume_ma - 1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            volume_momentum = values / volume_ma - 1
         
-        return volume_momentum.fillna(0)
+        return pd.Series(volume_momentum, index=volume.index).fillna(0)
 
 
 class PriceVolumeMomentumFactor(TechnicalFactor):
@@ -166,27 +176,36 @@ class PriceVolumeMomentumFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算价量动量因子"""
-        close = data['close']
-        volume = data['volume']
+        from ._kernels import _rolling_mean
+        close = data['close'].to_numpy(dtype=np.float64)
+        volume = data['volume'].to_numpy(dtype=np.float64)
         
-        # 计算价格变化
-        price_change = close.pct_change()
-        
-        # 计算成交量变化
-        volume_change = volume.pct_change()
+        # 计算价格变化与成交量变化 (首期无前值, 记为NaN)
+        price_change = np.full_like(close, np.nan)
+        volume_change = np.full_like(volume, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            np.divide(close[1:], close[:-1], out=price_change[1:])
+            np.divide(volume[1:], volume[:-1], out=volume_change[1:])
+        price_change -= 1
+        volume_change -= 1
         
         # 价量动量 = 价格动量 * 成交量动量的符号
-        pv_momentum = price_change * np.sign(volume_change)
+        # 符号由两次比较相减得到 (无分支, int8); 成交量变化为NaN时 (如连续零成交量) 记为0
+        volume_sign = (volume_change > 0).astype(np.int8)
+        volume_sign -= volume_change < 0
+        pv_momentum = price_change * volume_sign
         
         # 滑动平均平滑
-        pv_momentum_smooth = pv_momentum.rolling(window=self.window).mean()
+        pv_momentum_smooth = _rolling_mean(pv_momentum, self.window)
         
-        return pv_momentum_smooth.fillna(0)
+        return pd.Series(pv_momentum_smooth, index=data.index).fillna(0)
 
 
 class AccelerationFactor(TechnicalFactor):
     """价格加速度因子"""
     
+    PANEL_VECTORIZED = True
+    
     def __init__(self, window: int = 10):
         metadata = FactorMetadata(
             name=f"acceleration_{window}",
@@ -220,6 +239,8 @@ class AccelerationFactor(TechnicalFactor):
 class ROCFactor(TechnicalFactor):
     """变化率因子 (Rate of Change)"""
     
+    PANEL_VECTORIZED = True
+    
     def __init__(self, window: int = 12):
         metadata = FactorMetadata(
             name=f"roc_{window}",
@@ -239,7 +260,8 @@ class ROCFactor(TechnicalFactor):
         close = data['close']
         
         # ROC = (当前价格 - N期前价格) / N期前价格 * 100
-        roc = ((close - close.shift(self.window)) / close.shift(self.window)) * 100
+        shifted = close.shift(self.window)
+        roc = ((close - shifted) / shifted) * 100
         
         return roc.fillna(0)
 
@@ -260,9 +282,9 @@ def register_momentum_factors():
         ROCFactor(24)
     ]
     
-    for factor in factors:
-        factor_registry.register(factor)
+    factor_registry.register_many(factors)
 
 
-# 自动注册
-register_momentum_factors() 
\ No newline at end of file
+# 自动注册 (FACTOR_AUTOREGISTER=false 时跳过, 由 factor_registry.autodiscover() 显式注册)
+if get_settings().factor.autoregister:
+    register_momentum_factors() 
\ No newline at end of file
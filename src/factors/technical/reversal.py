@@ -6,12 +6,23 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from src.config.settings import get_settings
 from ..base.factor import TechnicalFactor, FactorMetadata, factor_registry
+from ..base import expr_cache
+from .momentum import rolling_rsi
+
+# 编译内核 (._kernels) 依赖numba, 在用到的方法内按需导入: 仅导入本模块或只计算纯pandas因子时不加载numba
+
+
+# 反转信号取值 (int8存储, 内存占用为float64的1/8)
+_LONG, _FLAT, _SHORT = np.int8(1), np.int8(0), np.int8(-1)
 
 
 class ReversalFactor(TechnicalFactor):
     """短期反转因子"""
     
+    PANEL_VECTORIZED = True
+    
     def __init__(self, window: int = 5):
         metadata = FactorMetadata(
             name=f"reversal_{window}",
@@ -28,10 +39,8 @@ class ReversalFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算短期反转因子"""
-        close = data['close']
-        
-        # 计算反转信号（负的收益率）
-        returns = close.pct_change(periods=self.window)
+        # 计算反转信号（负的收益率, 与同窗口动量因子共享收益率）
+        returns = expr_cache.pct_change(data, 'close', self.window)
         reversal_signal = -returns  # 反转信号与收益率相反
         
         return reversal_signal.fillna(0)
@@ -58,23 +67,15 @@ class RSIReversalFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算RSI反转因子"""
-        close = data['close']
-        
-        # 计算RSI
-        delta = close.diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.rolling(window=self.window).mean()
-        avg_loss = loss.rolling(window=self.window).mean()
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
+        # 计算RSI (简单移动平均口径, 与RSI动量因子共享)
+        rsi = rolling_rsi(data, self.window)
         
         # 生成反转信号
-        reversal_signal = pd.Series(0, index=rsi.index)
-        reversal_signal[rsi < self.oversold] = 1   # 超卖，看涨
-        reversal_signal[rsi > self.overbought] = -1  # 超买，看跌
+        reversal_signal = pd.Series(
+            np.where(rsi > self.overbought, _SHORT,   # 超买，看跌
+                     np.where(rsi < self.oversold, _LONG, _FLAT)),  # 超卖，看涨
+            index=rsi.index
+        )
         
         return reversal_signal
 
@@ -112,9 +113,11 @@ class StochasticReversalFactor(TechnicalFactor):
         d_percent = k_percent.rolling(window=self.d_window).mean()
         
         # 生成反转信号
-        reversal_signal = pd.Series(0, index=d_percent.index)
-        reversal_signal[d_percent < 20] = 1   # 超卖
-        reversal_signal[d_percent > 80] = -1  # 超买
+        reversal_signal = pd.Series(
+            np.where(d_percent > 80, _SHORT,   # 超买
+                     np.where(d_percent < 20, _LONG, _FLAT)),  # 超卖
+            index=d_percent.index
+        )
         
         return reversal_signal
 
@@ -148,9 +151,11 @@ class WilliamsRReversalFactor(TechnicalFactor):
         williams_r = -100 * (highest_high - close) / (highest_high - lowest_low)
         
         # 生成反转信号
-        reversal_signal = pd.Series(0, index=williams_r.index)
-        reversal_signal[williams_r > -20] = -1  # 超买
-        reversal_signal[williams_r < -80] = 1   # 超卖
+        reversal_signal = pd.Series(
+            np.where(williams_r < -80, _LONG,   # 超卖
+                     np.where(williams_r > -20, _SHORT, _FLAT)),  # 超买
+            index=williams_r.index
+        )
         
         return reversal_signal
 
@@ -177,9 +182,9 @@ class BollingerReversalFactor(TechnicalFactor):
         """计算布林带反转因子"""
         close = data['close']
         
-        # 计算布林带
-        sma = close.rolling(window=self.window).mean()
-        std = close.rolling(window=self.window).std()
+        # 计算布林带 (移动平均和标准差与布林带波动率因子共享)
+        sma = expr_cache.rolling(data, 'close', self.window, 'mean')
+        std = expr_cache.rolling(data, 'close', self.window, 'std')
         upper_band = sma + (std * self.std_dev)
         lower_band = sma - (std * self.std_dev)
         
@@ -187,9 +192,11 @@ class BollingerReversalFactor(TechnicalFactor):
         bb_position = (close - lower_band) / (upper_band - lower_band)
         
         # 生成反转信号
-        reversal_signal = pd.Series(0, index=bb_position.index)
-        reversal_signal[bb_position > 0.9] = -1  # 接近上轨，看跌
-        reversal_signal[bb_position < 0.1] = 1   # 接近下轨，看涨
+        reversal_signal = pd.Series(
+            np.where(bb_position < 0.1, _LONG,   # 接近下轨，看涨
+                     np.where(bb_position > 0.9, _SHORT, _FLAT)),  # 接近上轨，看跌
+            index=bb_position.index
+        )
         
         return reversal_signal
 
@@ -197,6 +204,8 @@ class BollingerReversalFactor(TechnicalFactor):
 class MeanReversionFactor(TechnicalFactor):
     """均值回归因子"""
     
+    PANEL_VECTORIZED = True
+    
     def __init__(self, short_window: int = 5, long_window: int = 20):
         metadata = FactorMetadata(
             name=f"mean_reversion_{short_window}_{long_window}",
@@ -258,11 +267,12 @@ class VolumeReversalFactor(TechnicalFactor):
         
         # 高成交量且价格下跌 -> 反转看涨
         # 高成交量且价格上涨 -> 反转看跌
-        reversal_signal = pd.Series(0, index=close.index)
-        
         high_volume = volume_ratio > 1.5
-        reversal_signal[high_volume & (price_change < -0.02)] = 1   # 大跌后反转
-        reversal_signal[high_volume & (price_change > 0.02)] = -1  # 大涨后反转
+        reversal_signal = pd.Series(
+            np.where(high_volume & (price_change > 0.02), _SHORT,   # 大涨后反转
+                     np.where(high_volume & (price_change < -0.02), _LONG, _FLAT)),  # 大跌后反转
+            index=close.index
+        )
         
         return reversal_signal
 
@@ -286,6 +296,7 @@ class CommodityChannelReversalFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算CCI反转因子"""
+        from ._kernels import _rolling_mean_abs_dev
         high = data['high']
         low = data['low']
         close = data['close']
@@ -295,15 +306,18 @@ class CommodityChannelReversalFactor(TechnicalFactor):
         
         # 计算CCI
         sma_tp = typical_price.rolling(window=self.window).mean()
-        mad = typical_price.rolling(window=self.window).apply(
-            lambda x: np.mean(np.abs(x - x.mean()))
+        mad = pd.Series(
+            _rolling_mean_abs_dev(typical_price.to_numpy(dtype=np.float64), self.window),
+            index=typical_price.index
         )
         cci = (typical_price - sma_tp) / (0.015 * mad)
         
         # 生成反转信号
-        reversal_signal = pd.Series(0, index=cci.index)
-        reversal_signal[cci > 100] = -1  # 超买
-        reversal_signal[cci < -100] = 1  # 超卖
+        reversal_signal = pd.Series(
+            np.where(cci < -100, _LONG,   # 超卖
+                     np.where(cci > 100, _SHORT, _FLAT)),  # 超买
+            index=cci.index
+        )
         
         return reversal_signal
 
@@ -324,9 +338,9 @@ def register_reversal_factors():
         CommodityChannelReversalFactor(20)
     ]
     
-    for factor in factors:
-        factor_registry.register(factor)
+    factor_registry.register_many(factors)
 
 
-# 自动注册
-register_reversal_factors() 
\ No newline at end of file
+# 自动注册 (FACTOR_AUTOREGISTER=false 时跳过, 由 factor_registry.autodiscover() 显式注册)
+if get_settings().factor.autoregister:
+    register_reversal_factors() 
\ No newline at end of file
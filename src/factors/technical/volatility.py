@@ -6,12 +6,30 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
+from typing import Tuple
+from src.config.settings import get_settings
 from ..base.factor import TechnicalFactor, FactorMetadata, factor_registry
+from ..base import expr_cache
+
+# 编译内核 (._kernels) 依赖numba, 在用到的方法内按需导入: 仅导入本模块或只计算纯pandas因子时不加载numba
+
+
+def _returns_skew_kurt(data: pd.DataFrame, window: int) -> Tuple[pd.Series, pd.Series]:
+    """收益率的滚动偏度与峰度 (表达式缓存, 偏度与峰度因子共享同一次内核计算)"""
+    def compute():
+        from ._kernels import _rolling_skew_kurt
+        returns = expr_cache.pct_change(data)
+        skew, kurt = _rolling_skew_kurt(returns.to_numpy(dtype=np.float64), window)
+        return pd.Series(skew, index=returns.index), pd.Series(kurt, index=returns.index)
+    
+    return expr_cache.cached(data, ('returns_skew_kurt', 'close', window), compute)
 
 
 class VolatilityFactor(TechnicalFactor):
     """历史波动率因子"""
     
+    PANEL_VECTORIZED = True
+    
     def __init__(self, window: int = 20):
         metadata = FactorMetadata(
             name=f"volatility_{window}",
@@ -28,10 +46,8 @@ class VolatilityFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算历史波动率"""
-        close = data['close']
-        
         # 计算对数收益率
-        returns = np.log(close / close.shift(1))
+        returns = expr_cache.log_price(data, 'close').diff()
         
         # 计算滚动标准差（年化）
         volatility = returns.rolling(window=self.window).std() * np.sqrt(252)
@@ -58,17 +74,20 @@ class ATRFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算ATR"""
-        high = data['high']
-        low = data['low']
+        high = data['high'].to_numpy(dtype=np.float64)
+        low = data['low'].to_numpy(dtype=np.float64)
         close = data['close']
-        prev_close = close.shift(1)
-        
-        # 计算真实波幅
-        tr1 = high - low
-        tr2 = abs(high - prev_close)
-        tr3 = abs(low - prev_close)
+        prev_close = close.shift(1).to_numpy(dtype=np.float64)
         
-        true_range = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
+        # 计算真实波幅: fmax逐元素取最大并跳过NaN, 与 DataFrame.max(axis=1) 一致;
+        # 两个跳空幅度复用同一块缓冲区原地计算, 不再把三个数组堆叠成 3×N 的临时数组
+        true_range = high - low
+        gap = np.abs(high - prev_close)
+        np.fmax(true_range, gap, out=true_range)
+        np.subtract(low, prev_close, out=gap)
+        np.abs(gap, out=gap)
+        np.fmax(true_range, gap, out=true_range)
+        true_range = pd.Series(true_range, index=close.index)
         
         # 计算ATR
         atr = true_range.rolling(window=self.window).mean()
@@ -79,6 +98,8 @@ class ATRFactor(TechnicalFactor):
 class BollingerVolatilityFactor(TechnicalFactor):
     """布林带波动率因子"""
     
+    PANEL_VECTORIZED = True
+    
     def __init__(self, window: int = 20, std_dev: float = 2.0):
         metadata = FactorMetadata(
             name=f"bollinger_volatility_{window}_{std_dev}",
@@ -96,11 +117,9 @@ class BollingerVolatilityFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算布林带波动率"""
-        close = data['close']
-        
-        # 计算移动平均和标准差
-        sma = close.rolling(window=self.window).mean()
-        std = close.rolling(window=self.window).std()
+        # 计算移动平均和标准差 (与布林带反转因子共享)
+        sma = expr_cache.rolling(data, 'close', self.window, 'mean')
+        std = expr_cache.rolling(data, 'close', self.window, 'std')
         
         # 布林带宽度（标准化波动率）
         bb_width = (std * self.std_dev * 2) / sma
@@ -129,31 +148,29 @@ class GARCHVolatilityFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算GARCH波动率"""
-        close = data['close']
-        
+        from ._kernels import _garch_variance
         # 计算收益率
-        returns = close.pct_change().fillna(0)
-        
-        # 初始化方差序列
-        variance = pd.Series(index=returns.index, dtype=float)
-        
-        # 计算初始方差
-        initial_var = returns.head(self.window).var()
-        variance.iloc[:self.window] = initial_var
+        returns = expr_cache.pct_change(data).fillna(0)
         
-        # GARCH(1,1)模型
-        for i in range(self.window, len(returns)):
-            if i > 0:
-                variance.iloc[i] = (
-                    (1 - self.alpha - self.beta) * returns.iloc[:i].var() +
-                    self.alpha * returns.iloc[i-1]**2 +
-                    self.beta * variance.iloc[i-1]
-                )
+        # GARCH(1,1)模型: 编译内核逐期递推, 无条件方差增量更新
+        variance = _garch_variance(
+            returns.to_numpy(dtype=np.float64), self.window, float(self.alpha), float(self.beta)
+        )
         
         # 返回波动率（方差的平方根）
-        volatility = np.sqrt(variance)
+        volatility = pd.Series(np.sqrt(variance), index=returns.index)
         
         return volatility.fillna(0)
+    
+    def calculate_panel(self, panel, **kwargs) -> pd.DataFrame:
+        """计算GARCH波动率面板 (各标的在编译内核中并行递推)"""
+        from ._kernels import _garch_variance_panel
+        returns = panel['close'].pct_change().fillna(0)
+        variance = _garch_variance_panel(
+            returns.to_numpy(dtype=np.float64), self.window, float(self.alpha), float(self.beta)
+        )
+        volatility = pd.DataFrame(np.sqrt(variance), index=returns.index, columns=returns.columns)
+        return volatility.fillna(0)
 
 
 class VolatilitySkewFactor(TechnicalFactor):
@@ -175,13 +192,8 @@ class VolatilitySkewFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算波动率偏度"""
-        close = data['close']
-        
-        # 计算收益率
-        returns = close.pct_change()
-        
         # 计算滚动偏度
-        skewness = returns.rolling(window=self.window).skew()
+        skewness, _ = _returns_skew_kurt(data, self.window)
         
         return skewness.fillna(0)
 
@@ -205,13 +217,8 @@ class VolatilityKurtosisFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算波动率峰度"""
-        close = data['close']
-        
-        # 计算收益率
-        returns = close.pct_change()
-        
         # 计算滚动峰度
-        kurtosis = returns.rolling(window=self.window).kurt()
+        _, kurtosis = _returns_skew_kurt(data, self.window)
         
         return kurtosis.fillna(0)
 
@@ -235,15 +242,19 @@ class RealizedVolatilityFactor(TechnicalFactor):
     
     def calculate(self, data: pd.DataFrame, **kwargs) -> pd.Series:
         """计算已实现波动率"""
-        high = data['high']
-        low = data['low']
+        from ._kernels import _garman_klass_volatility
         close = data['close']
         
-        # Garman-Klass估计器
-        gk_volatility = np.log(high/low) * np.log(high/close) + np.log(low/close) * np.log(low/close)
-        
-        # 滚动求和并年化
-        realized_vol = np.sqrt(gk_volatility.rolling(window=self.window).sum() * 252)
+        # Garman-Klass估计器: 逐期贡献、滚动求和与年化在编译内核中完成
+        realized_vol = pd.Series(
+            _garman_klass_volatility(
+                data['high'].to_numpy(dtype=np.float64),
+                data['low'].to_numpy(dtype=np.float64),
+                close.to_numpy(dtype=np.float64),
+                self.window
+            ),
+            index=close.index
+        )
         
         return realized_vol.fillna(0)
 
@@ -264,9 +275,9 @@ def register_volatility_factors():
         RealizedVolatilityFactor(20)
     ]
     
-    for factor in factors:
-        factor_registry.register(factor)
+    factor_registry.register_many(factors)
 
 
-# 自动注册
-register_volatility_factors() 
\ No newline at end of file
+# 自动注册 (FACTOR_AUTOREGISTER=false 时跳过, 由 factor_registry.autodiscover() 显式注册)
+if get_settings().factor.autoregister:
+    register_volatility_factors() 
\ No newline at end of file
@@ -0,0 +1,24 @@
+"""
+Numba兼容模块
+numba可用时提供真正的JIT编译, 否则退化为原生Python执行
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:  # pragma: no cover - 取决于运行环境
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """numba不可用时的空装饰器, 兼容 @njit 和 @njit(...) 两种写法"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+__all__ = ["njit", "prange", "NUMBA_AVAILABLE"]
@@ -9,15 +9,30 @@ from loguru import logger
 from src.config.settings import get_settings
 
 
+# 处理器是否已配置; 模块被重新加载 (importlib.reload) 时沿用已有的值, 不会重复移除/添加处理器
+_CONFIGURED = globals().get("_CONFIGURED", False)
+
+
 class Logger:
     """日志管理器"""
     
     def __init__(self):
-        self.settings = get_settings().logging
-        self._setup_logger()
+        # 配置在首次获取日志器时读取, 导入本模块不产生任何副作用
+        self._settings = None
+    
+    @property
+    def settings(self):
+        """日志配置"""
+        if self._settings is None:
+            self._settings = get_settings().logging
+        return self._settings
     
     def _setup_logger(self):
-        """配置日志"""
+        """配置日志 (进程内只执行一次)"""
+        global _CONFIGURED
+        if _CONFIGURED:
+            return
+        
         # 移除默认处理器
         logger.remove()
         
@@ -30,8 +45,7 @@ class Logger:
         )
         
         # 文件输出
-        log_path = Path(self.settings.file_path)
-        log_path.parent.mkdir(parents=True, exist_ok=True)
+        Path(self.settings.file_path).parent.mkdir(parents=True, exist_ok=True)
         
         logger.add(
             self.settings.file_path,
@@ -41,9 +55,12 @@ class Logger:
             retention=self.settings.retention,
             compression="zip"
         )
+        
+        _CONFIGURED = True
     
     def get_logger(self, name: str = None):
         """获取指定名称的日志器"""
+        self._setup_logger()
         if name:
             return logger.bind(name=name)
         return logger
@@ -51,9 +68,15 @@ class Logger:
 
 # 全局日志器实例
 _logger_manager = Logger()
-log = _logger_manager.get_logger()
 
 
 def get_logger(name: str = None):
     """获取日志器"""
-    return _logger_manager.get_logger(name) 
\ No newline at end of file
+    return _logger_manager.get_logger(name)
+
+
+def __getattr__(name: str):
+    # 模块属性 log 延迟到首次访问时创建, 届时才配置处理器
+    if name == "log":
+        return get_logger()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
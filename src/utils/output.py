@@ -0,0 +1,24 @@
+"""
+输出工具
+测试脚本共用的标准输出缓冲
+"""
+
+import contextlib
+import functools
+import io
+import sys
+
+
+def buffered_output(method):
+    """测试步骤的输出先写入内存缓冲区, 步骤结束时一次性写出; 交互终端下直接输出"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if sys.stdout.isatty():
+            return method(*args, **kwargs)
+        buf = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(buf):
+                return method(*args, **kwargs)
+        finally:
+            sys.stdout.write(buf.getvalue())
+    return wrapper
@@ -6,6 +6,8 @@ Momentum_20 因子有效性测试脚本
 
 import sys
 import os
+import argparse
+from typing import Optional
 import pandas as pd
 import numpy as np
 import asyncio
@@ -20,15 +22,16 @@ from src.factors.base.factor import factor_registry
 from src.evaluation.metrics.ic_analysis import ICAnalyzer
 from src.evaluation.metrics.performance import PerformanceAnalyzer
 from src.evaluation.backtesting.engine import BacktestEngine, BacktestConfig
-from src.data.collectors.exchange import MultiExchangeCollector
+from src.data.collectors.exchange import MultiExchangeCollector, close_shared_session
+from src.utils.output import buffered_output
 import src.factors.technical  # 触发因子注册
 
 
 class Momentum20Tester:
     """Momentum_20 因子测试器"""
     
-    def __init__(self):
-        self.factor_name = "momentum_20"
+    def __init__(self, factor_name: str = "momentum_20"):
+        self.factor_name = factor_name
         self.factor = factor_registry.get_factor(self.factor_name)
         self.ic_analyzer = ICAnalyzer()
         self.performance_analyzer = PerformanceAnalyzer()
@@ -41,31 +44,33 @@ class Momentum20Tester:
         print(f"📋 因子描述: {self.factor.metadata.description}")
         print(f"📈 计算窗口: {self.factor.metadata.calculation_window}")
     
-    def create_synthetic_data(self, days: int = 100) -> pd.DataFrame:
-        """创建合成测试数据"""
+    def create_synthetic_data(self, days: int = 100, rng: Optional[np.random.Generator] = None) -> pd.DataFrame:
+        """
+        创建合成测试数据
+        
+        Args:
+            days: 天数
+            rng: 随机数生成器, 默认以种子42新建; 多组种子并行模拟时由调用方按进程传入
+        """
         print(f"\n📊 创建 {days} 天的合成测试数据...")
         
         dates = pd.date_range('2024-01-01', periods=days, freq='D')
-        np.random.seed(42)
+        if rng is None:
+            rng = np.random.default_rng(42)
         
         # 生成具有趋势的价格数据
-        price = 50000
-        prices = [price]
-        
-        for i in range(days - 1):
-            # 添加一些趋势性，使momentum因子更有效
-            trend = 0.0005 if i % 30 < 15 else -0.0005  # 周期性趋势
-            noise = np.random.normal(0, 0.02)
-            change = trend + noise
-            price = price * (1 + change)
-            prices.append(price)
+        # 添加一些趋势性，使momentum因子更有效
+        steps = np.arange(days - 1)
+        trend = np.where(steps % 30 < 15, 0.0005, -0.0005)  # 周期性趋势
+        noise = rng.normal(0, 0.02, size=days - 1)
+        prices = np.cumprod(np.concatenate(([50000.0], 1 + (trend + noise))))
         
         data = pd.DataFrame({
             'open': prices,
-            'high': [p * (1 + abs(np.random.normal(0, 0.01))) for p in prices],
-            'low': [p * (1 - abs(np.random.normal(0, 0.01))) for p in prices],
+            'high': prices * (1 + np.abs(rng.normal(0, 0.01, size=days))),
+            'low': prices * (1 - np.abs(rng.normal(0, 0.01, size=days))),
             'close': prices,
-            'volume': [np.random.uniform(1000, 10000) for _ in prices]
+            'volume': rng.uniform(1000, 10000, size=days)
         }, index=dates)
         
         print(f"✅ 数据创建完成: {len(data)} 行")
@@ -98,6 +103,23 @@ class Momentum20Tester:
             print("🔄 使用合成数据代替...")
             return self.create_synthetic_data(days)
     
+    def _warmup_factor(self):
+        """用少量确定性数据预先计算一次因子, 触发延迟导入与numba编译; 失败不影响正式测试"""
+        try:
+            rows = self.factor.metadata.calculation_window + 5
+            prices = np.linspace(100.0, 110.0, rows)
+            warmup_data = pd.DataFrame({
+                'open': prices,
+                'high': prices * 1.01,
+                'low': prices * 0.99,
+                'close': prices,
+                'volume': np.full(rows, 1000.0)
+            }, index=pd.date_range('2024-01-01', periods=rows, freq='D'))
+            self.factor.calculate(warmup_data)
+        except Exception as e:
+            print(f"⚠️  因子预热失败: {e}")
+    
+    @buffered_output
     def test_factor_calculation(self, data: pd.DataFrame) -> pd.Series:
         """测试因子计算"""
         print(f"\n🧮 测试 {self.factor_name} 因子计算...")
@@ -127,15 +149,13 @@ class Momentum20Tester:
             print(f"❌ 因子计算失败: {e}")
             raise
     
+    @buffered_output
     def test_ic_analysis(self, factor_values: pd.Series, price_data: pd.DataFrame) -> dict:
         """测试IC分析"""
         print(f"\n📈 进行 {self.factor_name} IC分析...")
         
         try:
-            # 计算收益率
-            returns = price_data['close'].pct_change()
-            
-            # 进行综合IC分析
+            # 进行综合IC分析 (收益率在分析器内部计算并一次性对齐)
             ic_results = self.ic_analyzer.comprehensive_analysis(
                 factor_values=factor_values,
                 price_data=price_data,
@@ -178,6 +198,7 @@ class Momentum20Tester:
             print(f"❌ IC分析失败: {e}")
             return {}
     
+    @buffered_output
     def test_quantile_backtest(self, factor_values: pd.Series, price_data: pd.DataFrame) -> dict:
         """测试分层回测"""
         print(f"\n📊 进行 {self.factor_name} 分层回测...")
@@ -226,6 +247,7 @@ class Momentum20Tester:
             print(f"❌ 分层回测失败: {e}")
             return {}
     
+    @buffered_output
     def test_factor_backtest(self, factor_values: pd.Series, price_data: pd.DataFrame) -> dict:
         """测试因子回测"""
         print(f"\n🚀 进行 {self.factor_name} 因子回测...")
@@ -278,6 +300,7 @@ class Momentum20Tester:
             print(f"❌ 因子回测失败: {e}")
             return {}
     
+    @buffered_output
     def generate_evaluation_report(
         self, 
         ic_results: dict, 
@@ -288,11 +311,8 @@ class Momentum20Tester:
         print(f"\n📄 生成 {self.factor_name} 评估报告")
         print("=" * 60)
         
-        # 因子有效性评级
-        score = 0
-        total_checks = 0
-        
-        print("🎯 因子有效性评估:")
+        # 评分表: (名称, 数值说明, [(是否达标, 得分, 评级), ...], 未达标评级)
+        checks = []
         
         # 1. IC分析评估
         basic_stats = ic_results.get('basic_ic_stats', {})
@@ -300,38 +320,15 @@ class Momentum20Tester:
             period_1 = basic_stats.get('period_1', {})
             ic = period_1.get('ic', 0)
             ic_ir = period_1.get('ic_ir', 0)
+            abs_ic = abs(ic)
             
-            total_checks += 2
-            if abs(ic) > 0.05:
-                score += 2
-                ic_rating = "🔥 优秀"
-            elif abs(ic) > 0.02:
-                score += 1
-                ic_rating = "✅ 良好"
-            else:
-                ic_rating = "⚠️  一般"
-            
-            if abs(ic_ir) > 1.0:
-                score += 1
-                ir_rating = "✅ 稳定"
-            else:
-                ir_rating = "⚠️  不稳定"
-            
-            print(f"   IC表现: {ic_rating} (IC={ic:.4f})")
-            print(f"   IC稳定性: {ir_rating} (IC_IR={ic_ir:.4f})")
+            checks.append(("IC表现", f"IC={ic:.4f}", [(abs_ic > 0.05, 2, "🔥 优秀"), (abs_ic > 0.02, 1, "✅ 良好")], "⚠️  一般"))
+            checks.append(("IC稳定性", f"IC_IR={ic_ir:.4f}", [(abs(ic_ir) > 1.0, 1, "✅ 稳定")], "⚠️  不稳定"))
         
         # 2. 分层回测评估
         if quantile_results:
             factor_ic = quantile_results.get('factor_ic', 0)
-            total_checks += 1
-            
-            if abs(factor_ic) > 0.05:
-                score += 1
-                layer_rating = "✅ 分层效果好"
-            else:
-                layer_rating = "⚠️  分层效果一般"
-            
-            print(f"   分层效果: {layer_rating} (因子IC={factor_ic:.4f})")
+            checks.append(("分层效果", f"因子IC={factor_ic:.4f}", [(abs(factor_ic) > 0.05, 1, "✅ 分层效果好")], "⚠️  分层效果一般"))
         
         # 3. 回测表现评估
         if backtest_results:
@@ -340,25 +337,29 @@ class Momentum20Tester:
                 sharpe = performance_stats.get('sharpe_ratio', 0)
                 max_dd = performance_stats.get('max_drawdown', 0)
                 
-                total_checks += 2
-                if sharpe > 1.0:
-                    score += 1
-                    sharpe_rating = "✅ 风险调整收益好"
-                else:
-                    sharpe_rating = "⚠️  风险调整收益一般"
-                
-                if abs(max_dd) < 0.2:
-                    score += 1
-                    dd_rating = "✅ 回撤控制好"
-                else:
-                    dd_rating = "⚠️  回撤较大"
-                
-                print(f"   夏普比率: {sharpe_rating} ({sharpe:.3f})")
-                print(f"   回撤控制: {dd_rating} ({max_dd:.2%})")
+                checks.append(("夏普比率", f"{sharpe:.3f}", [(sharpe > 1.0, 1, "✅ 风险调整收益好")], "⚠️  风险调整收益一般"))
+                checks.append(("回撤控制", f"{max_dd:.2%}", [(abs(max_dd) < 0.2, 1, "✅ 回撤控制好")], "⚠️  回撤较大"))
+        
+        # 因子有效性评级: 每项取第一个达标档位的得分
+        score = 0
+        total_checks = 0
+        
+        print("🎯 因子有效性评估:")
         
-        # 总体评级
+        for name, value_text, tiers, default_rating in checks:
+            total_checks += 1
+            for passed, points, rating in tiers:
+                if passed:
+                    score += points
+                    break
+            else:
+                rating = default_rating
+            
+            print(f"   {name}: {rating} ({value_text})")
+        
+        # 总体评级 (没有可评估项时按0分处理)
+        final_score = score / total_checks if total_checks > 0 else 0.0
         if total_checks > 0:
-            final_score = score / total_checks
             if final_score >= 0.8:
                 overall_rating = "🔥 优秀"
             elif final_score >= 0.6:
@@ -387,11 +388,9 @@ class Momentum20Tester:
         print("=" * 60)
         
         try:
-            # 1. 获取数据
-            if use_real_data:
-                data = await self.get_real_data()
-            else:
-                data = self.create_synthetic_data()
+            # 1. 获取数据, 同时在线程中预热因子计算 (网络等待与模块导入/JIT编译重叠)
+            fetch = self.get_real_data() if use_real_data else asyncio.to_thread(self.create_synthetic_data)
+            data, _ = await asyncio.gather(fetch, asyncio.to_thread(self._warmup_factor))
             
             # 2. 测试因子计算
             factor_values = self.test_factor_calculation(data)
@@ -413,6 +412,25 @@ class Momentum20Tester:
         except Exception as e:
             print(f"❌ 测试过程中出现错误: {e}")
             raise
+        
+        finally:
+            # 断开交易所连接有超时保护, 网络异常时不会阻塞进程退出
+            await self.data_collector.disconnect_all(timeout=5.0)
+            await close_shared_session()
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="因子有效性测试工具")
+    parser.add_argument(
+        '--real', action=argparse.BooleanOptionalAction, default=True,
+        help="使用真实市场数据 (--no-real 使用合成数据)"
+    )
+    parser.add_argument(
+        '--factor', nargs='+', default=["momentum_20"],
+        help="待测试的因子名称, 可指定多个"
+    )
+    return parser.parse_args(argv)
 
 
 async def main():
@@ -421,13 +439,12 @@ async def main():
     print("使用说明: 本工具将对 momentum_20 因子进行全面的有效性评估")
     print()
     
-    # 询问用户是否使用真实数据
-    use_real = input("是否使用真实市场数据进行测试? (y/n, 默认 y): ").lower()
-    use_real_data = use_real != 'n'
+    args = parse_args()
     
-    # 创建测试器并运行测试
-    tester = Momentum20Tester()
-    await tester.run_comprehensive_test(use_real_data)
+    # 创建测试器并运行测试; 多个因子在同一进程中依次测试, 共享已导入的模块与编译缓存
+    for factor_name in args.factor:
+        tester = Momentum20Tester(factor_name)
+        await tester.run_comprehensive_test(args.real)
 
 
 if __name__ == "__main__":
@@ -6,6 +6,8 @@
 
 import sys
 import os
+import argparse
+from typing import Optional, Tuple
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -17,19 +19,22 @@ warnings.filterwarnings('ignore')
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from src.factors.base.factor import factor_registry
-from src.evaluation.metrics.ic_analysis import ICAnalyzer
+from src.evaluation.metrics.ic_analysis import ICAnalyzer, qcut_labels
 from src.evaluation.metrics.performance import PerformanceAnalyzer
+from src.utils.output import buffered_output
 import src.factors.technical  # 触发因子注册
 
 
 class SimpleMomentum20Tester:
     """简化版 Momentum_20 因子测试器"""
     
-    def __init__(self):
-        self.factor_name = "momentum_20"
+    def __init__(self, factor_name: str = "momentum_20"):
+        self.factor_name = factor_name
         self.factor = factor_registry.get_factor(self.factor_name)
         self.ic_analyzer = ICAnalyzer()
         self.performance_analyzer = PerformanceAnalyzer()
+        # 当前行情数据的收盘价与收益率数组, 供各测试步骤共享
+        self._cache = {}
         
         if not self.factor:
             raise ValueError(f"因子 {self.factor_name} 不存在")
@@ -38,40 +43,46 @@ class SimpleMomentum20Tester:
         print(f"📋 因子描述: {self.factor.metadata.description}")
         print(f"📈 计算窗口: {self.factor.metadata.calculation_window}")
     
-    def create_test_data(self, days: int = 100, with_trend: bool = True) -> pd.DataFrame:
-        """创建测试数据"""
+    def create_test_data(
+        self,
+        days: int = 100,
+        with_trend: bool = True,
+        rng: Optional[np.random.Generator] = None
+    ) -> pd.DataFrame:
+        """
+        创建测试数据
+        
+        Args:
+            days: 天数
+            with_trend: 是否叠加周期性趋势
+            rng: 随机数生成器, 默认以种子42新建; 多组种子并行模拟时由调用方按进程传入
+        """
         print(f"\n📊 创建 {days} 天的测试数据...")
         
         dates = pd.date_range('2024-01-01', periods=days, freq='D')
-        np.random.seed(42)
+        if rng is None:
+            rng = np.random.default_rng(42)
         
-        price = 50000
-        prices = [price]
+        changes = rng.normal(0, 0.02, size=days - 1)
+        if with_trend:
+            # 添加周期性趋势，让动量因子更有效
+            changes = 0.001 * np.sin(np.arange(days - 1) * 2 * np.pi / 30) + changes  # 30天周期
+        # 否则为纯随机游走
         
-        for i in range(days - 1):
-            if with_trend:
-                # 添加周期性趋势，让动量因子更有效
-                trend = 0.001 * np.sin(i * 2 * np.pi / 30)  # 30天周期
-                noise = np.random.normal(0, 0.02)
-                change = trend + noise
-            else:
-                # 纯随机游走
-                change = np.random.normal(0, 0.02)
-            
-            price = price * (1 + change)
-            prices.append(price)
+        prices = np.cumprod(np.concatenate(([50000.0], 1 + changes)))
         
         data = pd.DataFrame({
             'open': prices,
-            'high': [p * (1 + abs(np.random.normal(0, 0.01))) for p in prices],
-            'low': [p * (1 - abs(np.random.normal(0, 0.01))) for p in prices],
+            'high': prices * (1 + np.abs(rng.normal(0, 0.01, size=days))),
+            'low': prices * (1 - np.abs(rng.normal(0, 0.01, size=days))),
             'close': prices,
-            'volume': [np.random.uniform(1000, 10000) for _ in prices]
+            'volume': rng.uniform(1000, 10000, size=days)
         }, index=dates)
         
         print(f"✅ 数据创建完成: {len(data)} 行")
         return data
     
+    @buffered_output
     def test_factor_calculation(self, data: pd.DataFrame) -> pd.Series:
         """测试因子计算"""
         print(f"\n🧮 测试 {self.factor_name} 因子计算...")
@@ -96,44 +107,44 @@ class SimpleMomentum20Tester:
         
         return factor_values
     
-    def test_ic_analysis(self, factor_values: pd.Series, price_data: pd.DataFrame) -> dict:
+    def _price_arrays(self, price_data: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """收盘价与一期收益率数组, 同一份行情数据只计算一次"""
+        if self._cache.get('data') is not price_data:
+            close = price_data['close'].to_numpy(dtype=np.float64)
+            returns = np.empty_like(close)
+            returns[:1] = np.nan
+            np.divide(close[1:], close[:-1], out=returns[1:])
+            returns[1:] -= 1
+            self._cache = {'data': price_data, 'close': close, 'ret': returns}
+        return self._cache['close'], self._cache['ret']
+    
+    @buffered_output
+    def test_ic_analysis(
+        self,
+        factor_values: pd.Series,
+        price_data: pd.DataFrame,
+        returns_arr: Optional[np.ndarray] = None
+    ) -> dict:
         """测试IC分析"""
         print(f"\n📈 进行 {self.factor_name} IC分析...")
         
-        # 计算未来收益率
-        returns = price_data['close'].pct_change()
+        # 一期收益率 (默认取共享的收益率数组)
+        if returns_arr is None:
+            returns_arr = self._price_arrays(price_data)[1]
+        returns = pd.Series(returns_arr, index=price_data.index)
         
         ic_results = {}
         periods = [1, 3, 5, 10, 20]
         
         print("📋 IC分析结果:")
         
+        # 各期IC、IC_IR、胜率与滚动IC由一次内核调用得到
+        period_ic = self.ic_analyzer.calculate_period_ic(factor_values, returns, periods, window=20)
+        
         for period in periods:
-            # 计算前瞻收益率
-            future_returns = returns.shift(-period)
-            
-            # 计算IC
-            ic = self.ic_analyzer.calculate_ic(factor_values, future_returns)
-            
-            # 计算滚动IC
-            rolling_ic = self.ic_analyzer.calculate_rolling_ic(
-                factor_values, future_returns, window=20
-            )
-            
-            # 计算IC_IR
-            ic_ir = self.ic_analyzer.calculate_ic_ir(
-                factor_values, future_returns, window=20
-            )
-            
-            # 计算IC胜率
-            ic_win_rate = (rolling_ic > 0).mean() if not rolling_ic.empty else 0
-            
-            ic_results[f'period_{period}'] = {
-                'ic': ic,
-                'ic_ir': ic_ir,
-                'ic_win_rate': ic_win_rate,
-                'rolling_ic': rolling_ic
-            }
+            stats = period_ic[f'period_{period}']
+            ic_results[f'period_{period}'] = stats
+            ic, ic_ir, ic_win_rate = stats['ic'], stats['ic_ir'], stats['ic_win_rate']
             
             # 显示结果
             status = "🔥" if abs(ic) > 0.05 else "✅" if abs(ic) > 0.02 else "⚠️"
@@ -141,58 +152,58 @@ class SimpleMomentum20Tester:
         
         return ic_results
     
-    def test_simple_backtest(self, factor_values: pd.Series, price_data: pd.DataFrame) -> dict:
+    @buffered_output
+    def test_simple_backtest(
+        self,
+        factor_values: pd.Series,
+        price_data: pd.DataFrame,
+        returns_arr: Optional[np.ndarray] = None
+    ) -> dict:
         """简单回测分析"""
         print(f"\n🔍 进行简单回测分析...")
         
-        # 计算收益率
-        returns = price_data['close'].pct_change()
-        future_returns = returns.shift(-1)  # 下一期收益率
+        # 下一期收益率: 直接在收益率数组上平移 (默认取共享的收益率数组), 因子按行情索引对齐
+        if returns_arr is None:
+            returns_arr = self._price_arrays(price_data)[1]
+        future_returns = np.full(len(returns_arr), np.nan)
+        future_returns[:-1] = returns_arr[1:]
+        factor_arr = factor_values.reindex(price_data.index).to_numpy(dtype=np.float64)
         
-        # 对齐数据
-        aligned_data = pd.concat([factor_values, future_returns], axis=1).dropna()
-        if len(aligned_data) < 10:
+        # 以NaN掩码剔除缺失样本, 不构造中间DataFrame
+        mask = ~(np.isnan(factor_arr) | np.isnan(future_returns))
+        factor_arr, future_returns = factor_arr[mask], future_returns[mask]
+        if len(factor_arr) < 10:
             print("❌ 数据不足进行回测")
             return {}
         
-        factor_col = aligned_data.iloc[:, 0]
-        return_col = aligned_data.iloc[:, 1]
-        
         # 分层分析
         quantiles = 5
-        aligned_data['quantile'] = pd.qcut(
-            factor_col, 
-            q=quantiles, 
-            labels=[f'Q{i+1}' for i in range(quantiles)],
-            duplicates='drop'
-        )
-        
-        # 计算各层表现
+        # 整数层号 (0 ~ 层数-1), 仅在输出时格式化为 Q1 ~ Q5
+        quantile_ids = qcut_labels(factor_arr, quantiles).astype(np.int8)
+        return_col = pd.Series(future_returns)
+        
+        # 计算各层表现: 按分层标签一次分组聚合, 代替逐层布尔掩码扫描
         quantile_stats = {}
         print("\n📊 分层分析结果:")
         
-        for q in aligned_data['quantile'].unique():
-            if pd.isna(q):
-                continue
-            
-            mask = aligned_data['quantile'] == q
-            q_returns = return_col[mask]
+        grouped = return_col.groupby(quantile_ids)
+        stats = grouped.agg(['mean', 'std', 'size'])
+        win_rates = (return_col > 0).groupby(quantile_ids).mean()
+        sharpes = (stats['mean'] / stats['std']).where(stats['std'] > 0, 0)
+        
+        for q, avg_return, std_return, sharpe, win_rate, count in zip(
+            stats.index, stats['mean'], stats['std'], sharpes, win_rates, stats['size']
+        ):
+            label = f'Q{q + 1}'
+            quantile_stats[label] = {
+                'avg_return': avg_return,
+                'std_return': std_return,
+                'sharpe': sharpe,
+                'win_rate': win_rate,
+                'count': int(count)
+            }
             
-            if len(q_returns) > 0:
-                avg_return = q_returns.mean()
-                std_return = q_returns.std()
-                sharpe = avg_return / std_return if std_return > 0 else 0
-                win_rate = (q_returns > 0).mean()
-                
-                quantile_stats[q] = {
-                    'avg_return': avg_return,
-                    'std_return': std_return,
-                    'sharpe': sharpe,
-                    'win_rate': win_rate,
-                    'count': len(q_returns)
-                }
-                
-                print(f"   {q}: 平均收益={avg_return:.4f}, 夏普={sharpe:.3f}, 胜率={win_rate:.2%}, 样本={len(q_returns)}")
+            print(f"   {label}: 平均收益={avg_return:.4f}, 夏普={sharpe:.3f}, 胜率={win_rate:.2%}, 样本={count}")
         
         # 计算多空组合收益
         if 'Q1' in quantile_stats and 'Q5' in quantile_stats:
@@ -201,9 +212,10 @@ class SimpleMomentum20Tester:
         
         return {
             'quantile_stats': quantile_stats,
-            'total_samples': len(aligned_data)
+            'total_samples': len(factor_arr)
         }
     
+    @buffered_output
     def generate_summary_report(self, ic_results: dict, backtest_results: dict):
         """生成总结报告"""
         print(f"\n📄 {self.factor_name} 因子评估总结")
@@ -303,6 +315,9 @@ class SimpleMomentum20Tester:
             # 2. 测试因子计算
             factor_values = self.test_factor_calculation(data)
             
+            # 收盘价与收益率数组只计算一次, 后续步骤共享
+            self._price_arrays(data)
+            
             # 3. IC分析
             ic_results = self.test_ic_analysis(factor_values, data)
             
@@ -326,19 +341,32 @@ class SimpleMomentum20Tester:
             raise
 
 
+def parse_args(argv=None) -> argparse.Namespace:
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="因子有效性测试工具 (简化版)")
+    parser.add_argument(
+        '--trend', action=argparse.BooleanOptionalAction, default=True,
+        help="使用包含趋势的测试数据 (--no-trend 使用纯随机游走数据)"
+    )
+    parser.add_argument(
+        '--factor', nargs='+', default=["momentum_20"],
+        help="待测试的因子名称, 可指定多个"
+    )
+    return parser.parse_args(argv)
+
+
 def main():
     """主函数"""
     print("🎯 Momentum_20 因子有效性测试工具 (简化版)")
     print("使用说明: 本工具对 momentum_20 因子进行基础的有效性评估")
     print()
     
-    # 询问用户是否使用趋势数据
-    use_trend = input("是否使用包含趋势的测试数据? (y/n, 默认 y): ").lower()
-    use_trend_data = use_trend != 'n'
+    args = parse_args()
     
-    # 创建测试器并运行测试
-    tester = SimpleMomentum20Tester()
-    results = tester.run_comprehensive_test(use_trend_data)
+    # 创建测试器并运行测试; 多个因子在同一进程中依次测试, 共享已导入的模块与编译缓存
+    for factor_name in args.factor:
+        tester = SimpleMomentum20Tester(factor_name)
+        tester.run_comprehensive_test(args.trend)
     
     # 显示如何进一步分析的建议
     print(f"\n📋 进一步分析建议:")
@@ -5,27 +5,99 @@
 
 import sys
 import os
+import time
+import functools
 import pandas as pd
 import numpy as np
 
 # 添加项目根目录到路径
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from src.factors.base.factor import factor_registry
+from src.evaluation.metrics.ic_analysis import ICAnalyzer
+from src.evaluation.metrics.performance import PerformanceAnalyzer
+from src.evaluation.backtesting.engine import BacktestEngine, BacktestConfig
+import src.factors.technical  # 触发因子注册
+
+
+@functools.lru_cache(maxsize=None)
+def _get_factor(name: str):
+    """按名称查询因子, 同名因子只查询一次注册表"""
+    return factor_registry.get_factor(name)
+
+
+# 各测试用到的因子只查询一次
+_FACTORS = {
+    name: _get_factor(name)
+    for name in ("momentum_20", "volatility_20", "reversal_5")
+}
+
+# 分析器实例在模块级创建一次, 各测试共享
+_IC_ANALYZER = ICAnalyzer()
+_PERFORMANCE_ANALYZER = PerformanceAnalyzer()
+
+
+def _make_ohlcv(days: int, seed: int = 42) -> pd.DataFrame:
+    """生成模拟OHLCV数据: 起始价格50000, 2%的日波动率"""
+    # 日期直接由datetime64[D]数组构造, 不经过date_range的频率推断
+    dates = pd.DatetimeIndex(np.datetime64('2024-01-01') + np.arange(days), name='timestamp')
+    rng = np.random.default_rng(seed)
+    
+    # 连乘得到价格路径
+    changes = rng.normal(0, 0.02, size=days - 1)
+    prices = np.cumprod(np.concatenate(([50000.0], 1 + changes)))
+    
+    # 最高/最低价的振幅一次整批抽取: 第0行用于最高价, 第1行用于最低价
+    spread = rng.normal(0, 0.01, size=(2, days))
+    np.abs(spread, out=spread)
+    
+    # 各列直接引用已构造好的float64数组 (open/close共用同一数组), 夹具只读, 不复制
+    return pd.DataFrame({
+        'open': prices,
+        'high': prices * (1 + spread[0]),
+        'low': prices * (1 - spread[1]),
+        'close': prices,
+        'volume': rng.uniform(1000, 10000, size=days)
+    }, index=dates, copy=False)
+
+
+# 各测试共享的只读行情数据, 模块导入时生成一次
+_OHLCV_100 = _make_ohlcv(100)
+_OHLCV_60 = _make_ohlcv(60)
+
+
+def _warmup_factors():
+    """用少量数据预先计算一次测试因子, 触发延迟导入与numba编译, 编译耗时不计入各测试"""
+    prices = np.linspace(100.0, 110.0, 50)
+    warmup_data = pd.DataFrame({
+        'open': prices,
+        'high': prices * 1.01,
+        'low': prices * 0.99,
+        'close': prices,
+        'volume': np.ones(50)
+    }, index=pd.DatetimeIndex(np.datetime64('2020-01-01') + np.arange(50)))
+    
+    for factor in _FACTORS.values():
+        if factor:
+            try:
+                factor.calculate(warmup_data)
+            except Exception:
+                # 预热失败不影响测试, 错误由正式测试报告
+                pass
+
+
 def test_factor_registry():
     """测试因子注册系统"""
     print("🧪 测试因子注册系统...")
     
     try:
-        from src.factors.base.factor import factor_registry
-        import src.factors.technical  # 触发因子注册
-        
         all_factors = factor_registry.list_factors()
         print(f"✅ 已注册因子数量: {len(all_factors)}")
         
         # 显示前几个因子
         print("前10个因子:")
         for i, factor_name in enumerate(all_factors[:10]):
-            factor = factor_registry.get_factor(factor_name)
+            factor = _get_factor(factor_name)
             if factor:
                 print(f"  {i+1}. {factor_name} ({factor.metadata.sub_category})")
         
@@ -36,44 +108,18 @@ def test_factor_registry():
         return False
 
 
-def test_factor_calculation():
+def test_factor_calculation(test_data: pd.DataFrame = _OHLCV_100):
     """测试因子计算功能"""
     print("\n🧪 测试因子计算功能...")
     
     try:
-        from src.factors.base.factor import factor_registry
-        import src.factors.technical
-        
-        # 创建模拟数据
-        dates = pd.date_range('2024-01-01', periods=100, freq='D')
-        np.random.seed(42)
-        
-        # 生成模拟价格数据
-        price = 50000  # 起始价格
-        prices = [price]
-        for _ in range(99):
-            change = np.random.normal(0, 0.02)  # 2%的日波动率
-            price = price * (1 + change)
-            prices.append(price)
-        
-        # 创建OHLCV数据
-        test_data = pd.DataFrame({
-            'timestamp': dates,
-            'open': prices,
-            'high': [p * (1 + abs(np.random.normal(0, 0.01))) for p in prices],
-            'low': [p * (1 - abs(np.random.normal(0, 0.01))) for p in prices],
-            'close': prices,
-            'volume': [np.random.uniform(1000, 10000) for _ in prices]
-        })
-        test_data.set_index('timestamp', inplace=True)
-        
         print(f"✅ 创建模拟数据: {len(test_data)} 行")
         
         # 测试几个因子
         test_factors = ["momentum_20", "volatility_20", "reversal_5"]
         
         for factor_name in test_factors:
-            factor = factor_registry.get_factor(factor_name)
+            factor = _FACTORS.get(factor_name)
             if factor:
                 try:
                     factor_values = factor.calculate(test_data)
@@ -96,19 +142,20 @@ def test_ic_analysis():
     print("\n🧪 测试IC分析功能...")
     
     try:
-        from src.evaluation.metrics.ic_analysis import ICAnalyzer
-        
         # 创建模拟数据
-        np.random.seed(42)
+        rng = np.random.default_rng(42)
         n = 100
-        factor_values = pd.Series(np.random.normal(0, 1, n))
-        returns = pd.Series(np.random.normal(0, 0.02, n))
+        factor_arr = rng.standard_normal(n)
+        return_arr = rng.normal(0, 0.02, n)
+        
+        # 添加一些相关性 (在float64数组上原地累加)
+        return_arr += factor_arr * 0.1  # 添加10%的相关性
         
-        # 添加一些相关性
-        returns = returns + factor_values * 0.1  # 添加10%的相关性
+        # 分析器接口按索引对齐, 只在调用处包装一次Series
+        factor_values = pd.Series(factor_arr)
+        returns = pd.Series(return_arr)
         
-        # 创建IC分析器
-        ic_analyzer = ICAnalyzer()
+        ic_analyzer = _IC_ANALYZER
         
         # 计算基础IC
         ic = ic_analyzer.calculate_ic(factor_values, returns)
@@ -134,14 +181,12 @@ def test_performance_analysis():
     print("\n🧪 测试性能分析功能...")
     
     try:
-        from src.evaluation.metrics.performance import PerformanceAnalyzer
-        
         # 创建模拟收益率数据
-        np.random.seed(42)
-        returns = pd.Series(np.random.normal(0.001, 0.02, 252))  # 一年的日收益率
+        rng = np.random.default_rng(42)
+        # 分析器接受ndarray (ReturnsLike), 直接传入数组, 不包装为Series
+        returns = rng.normal(0.001, 0.02, 252)  # 一年的日收益率
         
-        # 创建性能分析器
-        performance_analyzer = PerformanceAnalyzer()
+        performance_analyzer = _PERFORMANCE_ANALYZER
         
         # 计算基础指标
         sharpe = performance_analyzer.calculate_sharpe_ratio(returns)
@@ -154,7 +199,9 @@ def test_performance_analysis():
         
         # 综合分析
         comprehensive_stats = performance_analyzer.comprehensive_analysis(returns)
-        metrics_count = len([k for k, v in comprehensive_stats.items() if pd.notna(v)])
+        # 指标均为浮点标量: 一次性转为float64数组后向量化判断缺失值
+        values = np.fromiter(comprehensive_stats.values(), dtype=float, count=len(comprehensive_stats))
+        metrics_count = int(np.count_nonzero(~np.isnan(values)))
         print(f"✅ 综合分析: 计算了 {metrics_count} 个指标")
         
         return True
@@ -164,37 +211,13 @@ def test_performance_analysis():
         return False
 
 
-def test_backtest_engine():
+def test_backtest_engine(test_data: pd.DataFrame = _OHLCV_60):
     """测试回测引擎功能"""
     print("\n🧪 测试回测引擎功能...")
     
     try:
-        from src.evaluation.backtesting.engine import BacktestEngine, BacktestConfig
-        from src.factors.base.factor import factor_registry
-        import src.factors.technical
-        
-        # 创建模拟数据
-        dates = pd.date_range('2024-01-01', periods=60, freq='D')
-        np.random.seed(42)
-        
-        # 生成价格数据
-        price = 50000
-        prices = [price]
-        for _ in range(59):
-            change = np.random.normal(0, 0.02)
-            price = price * (1 + change)
-            prices.append(price)
-        
-        test_data = pd.DataFrame({
-            'open': prices,
-            'high': [p * 1.01 for p in prices],
-            'low': [p * 0.99 for p in prices],
-            'close': prices,
-            'volume': [1000] * 60
-        }, index=dates)
-        
         # 获取因子
-        factor = factor_registry.get_factor("momentum_20")
+        factor = _FACTORS["momentum_20"]
         if not factor:
             print("❌ 无法获取测试因子")
             return False
@@ -228,6 +251,36 @@ def test_backtest_engine():
         return False
 
 
+def _run_test(test_func) -> bool:
+    """
+    运行单个测试并输出耗时, 返回是否通过
+    
+    设置环境变量PROFILE时以cProfile剖析该测试, 按tottime输出耗时最多的20个函数
+    """
+    profiler = None
+    if os.environ.get("PROFILE"):
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
+    start = time.perf_counter()
+    try:
+        passed = bool(test_func())
+    except Exception as e:
+        print(f"❌ 测试 {test_func.__name__} 异常: {e}")
+        passed = False
+    elapsed = time.perf_counter() - start
+    
+    if profiler is not None:
+        import pstats
+        profiler.disable()
+        print(f"\n📊 {test_func.__name__} 性能剖析 (按tottime前20):")
+        pstats.Stats(profiler, stream=sys.stdout).sort_stats("tottime").print_stats(20)
+    
+    print(f"⏱️  {test_func.__name__}: {elapsed:.3f}s")
+    return passed
+
+
 def main():
     """主测试函数"""
     print("🚀 Factor Mining System - 新功能测试")
@@ -241,15 +294,10 @@ def main():
         test_backtest_engine
     ]
     
-    passed = 0
     total = len(tests)
+    _warmup_factors()
     
-    for test_func in tests:
-        try:
-            if test_func():
-                passed += 1
-        except Exception as e:
-            print(f"❌ 测试 {test_func.__name__} 异常: {e}")
+    passed = sum(_run_test(test_func) for test_func in tests)
     
     print("\n" + "="*50)
     print(f"测试结果: {passed}/{total} 通过")